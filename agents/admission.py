@@ -0,0 +1,110 @@
+import threading
+from contextlib import contextmanager
+from functools import partial
+
+import anyio
+import anyio.to_thread
+from fastapi import HTTPException
+
+from config.settings import (
+    LLM_GLOBAL_CONCURRENCY,
+    LLM_PROVIDER_CONCURRENCY,
+    LLM_QUEUE_SIZE,
+    LLM_QUEUE_TIMEOUT,
+    LLM_RETRY_AFTER,
+    AUTH_LANE_THREADS,
+)
+
+
+class AdmissionController:
+    """Concurrency limits for LLM-bound work.
+
+    ``reserve`` is an O(1) check made on the event loop before any thread is
+    used: at most ``global_limit`` calls run and ``max_queue`` more wait, the
+    rest get a 503 straight away.  ``slot`` then gates the actual provider call
+    on both the global and the per-provider limit, giving up after
+    ``queue_timeout`` seconds.
+    """
+
+    def __init__(self, global_limit: int, provider_limit: int, max_queue: int,
+                 queue_timeout: float, retry_after: int):
+        self.global_limit = global_limit
+        self.provider_limit = provider_limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self.admitted = 0
+        self.rejected = 0
+        self._global = threading.BoundedSemaphore(global_limit)
+        self._providers = {}
+        self._lock = threading.Lock()
+
+    def reject(self, reason: str):
+        with self._lock:
+            self.rejected += 1
+        return HTTPException(503, reason, headers={"Retry-After": str(self.retry_after)})
+
+    def reserve(self):
+        with self._lock:
+            full = self.admitted >= self.global_limit + self.max_queue
+            if not full:
+                self.admitted += 1
+        if full:
+            raise self.reject("Build queue is full, try again shortly")
+
+    def release(self):
+        with self._lock:
+            self.admitted -= 1
+
+    def _provider_semaphore(self, provider: str):
+        with self._lock:
+            if provider not in self._providers:
+                self._providers[provider] = threading.BoundedSemaphore(self.provider_limit)
+            return self._providers[provider]
+
+    @contextmanager
+    def slot(self, provider: str):
+        provider_sem = self._provider_semaphore(provider)
+        if not provider_sem.acquire(timeout=self.queue_timeout):
+            raise self.reject(f"Provider '{provider}' is saturated, try again shortly")
+        try:
+            if not self._global.acquire(timeout=self.queue_timeout):
+                raise self.reject("All LLM slots are busy, try again shortly")
+            try:
+                yield
+            finally:
+                self._global.release()
+        finally:
+            provider_sem.release()
+
+    def stats(self) -> dict:
+        return {
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "global_limit": self.global_limit,
+            "provider_limit": self.provider_limit,
+            "queue_size": self.max_queue,
+        }
+
+
+admission = AdmissionController(
+    LLM_GLOBAL_CONCURRENCY, LLM_PROVIDER_CONCURRENCY, LLM_QUEUE_SIZE, LLM_QUEUE_TIMEOUT, LLM_RETRY_AFTER
+)
+
+# Separate thread lanes so slow providers never occupy AnyIO's shared pool.
+# The LLM lane has room for every admitted request, so nothing queues inside
+# AnyIO where admission control cannot see it.
+llm_lane = anyio.CapacityLimiter(LLM_GLOBAL_CONCURRENCY + LLM_QUEUE_SIZE)
+auth_lane = anyio.CapacityLimiter(AUTH_LANE_THREADS)
+
+
+async def run_llm_bound(func, *args, **kwargs):
+    admission.reserve()
+    try:
+        return await anyio.to_thread.run_sync(partial(func, *args, **kwargs), limiter=llm_lane)
+    finally:
+        admission.release()
+
+
+async def run_in_auth_lane(func, *args, **kwargs):
+    return await anyio.to_thread.run_sync(partial(func, *args, **kwargs), limiter=auth_lane)
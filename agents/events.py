@@ -0,0 +1,162 @@
+import asyncio
+import json
+import os
+import socket
+import threading
+from datetime import datetime
+
+EVENT_BUS_DIR = os.getenv("EVENT_BUS_DIR", "/tmp/yodda-events")
+EVENT_QUEUE_SIZE = int(os.getenv("EVENT_QUEUE_SIZE", "256"))
+MAX_DATAGRAM = 64 * 1024
+
+
+class Subscription:
+    """A single WebSocket client's view of the bus.
+
+    Events are buffered in a bounded queue; if the client falls behind and the
+    queue fills up the subscription is marked lagged and the socket is closed,
+    so one slow dashboard can never grow a worker's memory without bound.
+    """
+
+    def __init__(self, email: str, is_admin: bool = False):
+        self.email = email
+        self.is_admin = is_admin
+        self.queue = asyncio.Queue(maxsize=EVENT_QUEUE_SIZE)
+        self.lagged = False
+
+    def wants(self, event: dict) -> bool:
+        owner = event.get("user")
+        return owner is None or self.is_admin or owner == self.email
+
+    def offer(self, event: dict):
+        if self.lagged or not self.wants(event):
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.lagged = True
+            # Wake the sender so it notices the overflow and disconnects.
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait({"type": "lagged"})
+
+
+class EventBus:
+    """Pub/sub bus fanned out across gunicorn workers.
+
+    Every worker binds a Unix datagram socket inside ``EVENT_BUS_DIR``; that
+    directory is the local broker.  ``publish`` delivers to this worker's
+    subscribers directly and sends one datagram to every other worker's socket,
+    whose reader thread hands it to that worker's event loop.
+
+    Events whose type has a handler registered with ``on`` are control
+    messages: they run the handler in each worker instead of reaching
+    subscribers.
+    """
+
+    def __init__(self, directory: str = EVENT_BUS_DIR):
+        self.directory = directory
+        self.subscribers = set()
+        self.handlers = {}
+        self.loop = None
+        self.path = None
+        self._sock = None
+        self._sender = None
+        self._reader = None
+
+    def start(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        os.makedirs(self.directory, exist_ok=True)
+        self.path = os.path.join(self.directory, f"{os.getpid()}.sock")
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._sock.bind(self.path)
+        self._sock.settimeout(1.0)
+        self._sender = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._sender.setblocking(False)
+        self._reader = threading.Thread(target=self._read_loop, name="event-bus-reader", daemon=True)
+        self._reader.start()
+
+    def stop(self):
+        for sock in (self._sock, self._sender):
+            if sock:
+                sock.close()
+        self._sock = self._sender = None
+        if self.path and os.path.exists(self.path):
+            os.unlink(self.path)
+        self.loop = None
+
+    def on(self, event_type: str, handler):
+        self.handlers[event_type] = handler
+
+    def subscribe(self, email: str, is_admin: bool = False) -> Subscription:
+        sub = Subscription(email, is_admin)
+        self.subscribers.add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription):
+        self.subscribers.discard(sub)
+
+    def publish(self, event: dict, user: str = None):
+        """Publish an event; ``user`` restricts delivery to that user (and admins)."""
+        event = {**event, "user": user, "worker": os.getpid(), "ts": datetime.utcnow().isoformat()}
+        self._dispatch(event)
+        if self._sender is None:
+            return
+        data = json.dumps(event).encode()
+        if len(data) > MAX_DATAGRAM:
+            return
+        for name in os.listdir(self.directory):
+            peer = os.path.join(self.directory, name)
+            if peer == self.path or not name.endswith(".sock"):
+                continue
+            try:
+                self._sender.sendto(data, peer)
+            except (ConnectionRefusedError, FileNotFoundError):
+                # Worker exited without cleaning up its socket.
+                try:
+                    os.unlink(peer)
+                except OSError:
+                    pass
+            except OSError:
+                # Peer's receive buffer is full; it is the slow side, drop for it.
+                pass
+
+    def _dispatch(self, event: dict):
+        loop = self.loop
+        if loop is None or loop.is_closed():
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._deliver(event)
+        else:
+            loop.call_soon_threadsafe(self._deliver, event)
+
+    def _deliver(self, event: dict):
+        handler = self.handlers.get(event.get("type"))
+        if handler is not None:
+            handler(event)
+            return
+        for sub in list(self.subscribers):
+            sub.offer(event)
+
+    def _read_loop(self):
+        while self._sock is not None:
+            try:
+                data = self._sock.recv(MAX_DATAGRAM)
+            except socket.timeout:
+                continue
+            except (OSError, AttributeError):
+                return
+            try:
+                event = json.loads(data)
+            except ValueError:
+                continue
+            self._dispatch(event)
+
+
+bus = EventBus()
@@ -1,4 +1,5 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+from config.database import PLATFORMS
 
 class AdminSetup(BaseModel):
     email: str
@@ -36,6 +37,18 @@ class OrchestrateRequest(BaseModel):
     query: str
     platform: str = "web"
     theme: str = "dark-pro"
+    reuse: str | None = None  # off | offer | return | refine; defaults to SIMILAR_BUILD_MODE
+    use_skeleton: bool = True
+
+class MultiOrchestrateRequest(BaseModel):
+    query: str
+    platforms: list[str] = Field(default_factory=lambda: list(PLATFORMS))
+    theme: str = "dark-pro"
+    use_skeleton: bool = True
+
+class ProfileRequest(BaseModel):
+    requests: int = 10
+    interval_ms: float = 5.0
 
 class PluginRequest(BaseModel):
     provider: str
@@ -0,0 +1,276 @@
+import re
+
+FENCE_RE = re.compile(r"^[ \t]*```[ \t]*([\w+#.-]*)[^\n]*$", re.M)
+# Models sometimes close the fence on the last line of code ("</html>```").
+CLOSE_FENCE_RE = re.compile(r"```[ \t]*$", re.M)
+RAW_BLOCK_RE = re.compile(r"(<(script|style|pre|textarea)\b[^>]*>)(.*?)(</\2\s*>)", re.I | re.S)
+HTML_COMMENT_RE = re.compile(r"<!--(?!\[if|<!|>).*?-->", re.S)
+LINK_RE = re.compile(r"<link\b[^>]*>", re.I)
+JS_TYPES = ("", "text/javascript", "application/javascript", "module")
+JS_REGEX_PREFIX = set("(,=:[!&|?{};+-*%<>~^")
+JS_REGEX_KEYWORDS = ("return", "typeof", "case", "do", "else", "in", "of", "void", "yield", "await")
+
+
+def extract_code(text: str) -> str:
+    """Return the code inside the model's markdown fence, or the text itself.
+
+    When the response holds several fenced blocks the longest one wins (models
+    like to add a short usage snippet after the real file).  An opening fence
+    without a closing one means the output was truncated; everything after the
+    fence is kept so validation can report it.
+    """
+    blocks = []
+    pos = 0
+    while True:
+        fence = FENCE_RE.search(text, pos)
+        if fence is None:
+            break
+        close = CLOSE_FENCE_RE.search(text, fence.end())
+        if close is None:
+            blocks.append(text[fence.end():])
+            break
+        blocks.append(text[fence.end():close.start()])
+        pos = close.end()
+    if not blocks:
+        return text.strip()
+    return max(blocks, key=len).strip("\n").strip()
+
+
+def _attr(tag: str, name: str) -> str:
+    m = re.search(rf"\b{name}\s*=\s*[\"']?([^\"'\s>]*)", tag, re.I)
+    return m.group(1).lower() if m else ""
+
+
+def _css_pieces(css: str):
+    """Yield (is_literal, text) pieces of ``css`` with comments removed.
+
+    Comments and strings are recognised in one pass, so an apostrophe inside
+    a comment cannot be mistaken for the start of a string.
+    """
+    code = []
+    i, n = 0, len(css)
+    while i < n:
+        c = css[i]
+        if c in "\"'":
+            j = i + 1
+            while j < n and css[j] != c:
+                j += 2 if css[j] == "\\" else 1
+            yield False, "".join(code)
+            yield True, css[i:j + 1]
+            code = []
+            i = j + 1
+        elif css.startswith("/*", i):
+            j = css.find("*/", i + 2)
+            code.append(" ")
+            i = n if j == -1 else j + 2
+        else:
+            code.append(c)
+            i += 1
+    yield False, "".join(code)
+
+
+def minify_css(css: str) -> str:
+    out = []
+    for literal, part in _css_pieces(css):
+        if literal:
+            out.append(part)
+            continue
+        part = re.sub(r"\s+", " ", part)
+        # Never strip the space before ':' - "a :hover" and "a:hover" differ.
+        part = re.sub(r"\s*([{};,>])\s*", r"\1", part)
+        part = re.sub(r":\s+", ":", part)
+        part = part.replace(";}", "}")
+        out.append(part)
+    return "".join(out).strip()
+
+
+def _skip_js_string(js: str, i: int) -> int:
+    """Return the index just past the string or template literal starting at ``i``."""
+    quote, n = js[i], len(js)
+    j = i + 1
+    while j < n and js[j] != quote:
+        if js[j] == "\\":
+            j += 2
+        elif quote == "`" and js.startswith("${", j):
+            j = _skip_js_expression(js, j + 2)
+        else:
+            j += 1
+    return j + 1
+
+
+def _skip_js_expression(js: str, i: int) -> int:
+    """Return the index just past the ``}`` closing a template ``${`` expression."""
+    depth, n = 1, len(js)
+    while i < n:
+        c = js[i]
+        if c in "\"'`":
+            i = _skip_js_string(js, i)
+            continue
+        if c == "{":
+            depth += 1
+        elif c == "}":
+            depth -= 1
+            if not depth:
+                return i + 1
+        i += 1
+    return n
+
+
+def _js_pieces(js: str):
+    """Yield (is_literal, text) pieces of ``js`` with comments removed.
+
+    String, template and regex literals come back whole so callers never
+    rewrite their contents.
+    """
+    code = []
+    i, n = 0, len(js)
+    prev = ""  # last significant character emitted
+    word = ""  # last identifier emitted, for "return /re/" style regexes
+    while i < n:
+        c = js[i]
+        nxt = js[i + 1] if i + 1 < n else ""
+        if c in "\"'`":
+            j = _skip_js_string(js, i)
+            yield False, "".join(code)
+            yield True, js[i:j]
+            code = []
+            prev, word, i = c, "", j
+        elif c == "/" and nxt == "/":
+            j = js.find("\n", i)
+            i = n if j == -1 else j
+        elif c == "/" and nxt == "*":
+            j = js.find("*/", i + 2)
+            code.append(" ")
+            i = n if j == -1 else j + 2
+        elif c == "/" and (not prev or prev in JS_REGEX_PREFIX or word in JS_REGEX_KEYWORDS):
+            j, in_class = i + 1, False
+            while j < n and js[j] != "\n":
+                if js[j] == "\\":
+                    j += 2
+                    continue
+                if js[j] == "[":
+                    in_class = True
+                elif js[j] == "]":
+                    in_class = False
+                elif js[j] == "/" and not in_class:
+                    break
+                j += 1
+            yield False, "".join(code)
+            yield True, js[i:j + 1]
+            code = []
+            prev, word, i = "/", "", j + 1
+        else:
+            code.append(c)
+            if not c.isspace():
+                word = word + c if (c.isalnum() or c in "_$") else ""
+                prev = c
+            i += 1
+    yield False, "".join(code)
+
+
+def minify_js(js: str) -> str:
+    """Drop comments, indentation and blank lines outside of literals.
+
+    Newlines are kept so automatic semicolon insertion behaves exactly as in
+    the original source, and string/template literals are left byte for byte
+    (pages build much of their markup in multi-line templates).  Anything
+    cleverer belongs in a real JS toolchain.
+    """
+    out = []
+    for literal, part in _js_pieces(js):
+        out.append(part if literal else re.sub(r"[ \t\r]*\n\s*", "\n", part))
+    return "".join(out).strip()
+
+
+def minify_html(html: str) -> str:
+    out = []
+    last = 0
+    for m in RAW_BLOCK_RE.finditer(html):
+        out.append(_minify_markup(html[last:m.start()]))
+        open_tag, tag, body, close_tag = m.group(1), m.group(2).lower(), m.group(3), m.group(4)
+        if tag == "style":
+            body = minify_css(body)
+        elif tag == "script" and _attr(open_tag, "type") in JS_TYPES:
+            body = minify_js(body)
+        out.append(f"{open_tag}{body}{close_tag}")
+        last = m.end()
+    out.append(_minify_markup(html[last:]))
+    return "".join(out).strip()
+
+
+def _minify_markup(markup: str) -> str:
+    markup = HTML_COMMENT_RE.sub("", markup)
+    # Browsers collapse whitespace runs outside <pre>/<textarea> to one space anyway.
+    return re.sub(r"\s+", " ", markup)
+
+
+def dedupe_assets(html: str) -> str:
+    """Keep only the first copy of identical inline <style>/<script> blocks and external assets.
+
+    Only real tags count: a "<link>" inside a script string or a <pre> is text.
+    """
+    seen = set()
+
+    def first(key, text):
+        if key in seen:
+            return ""
+        seen.add(key)
+        return text
+
+    def external(m):
+        return first(re.sub(r"\s+", " ", m.group(0).lower()), m.group(0))
+
+    out = []
+    last = 0
+    for m in RAW_BLOCK_RE.finditer(html):
+        out.append(LINK_RE.sub(external, html[last:m.start()]))
+        open_tag, tag, body = m.group(1), m.group(2).lower(), m.group(3)
+        if tag in ("style", "script") and body.strip():
+            out.append(first((tag, _attr(open_tag, "type"), body.strip()), m.group(0)))
+        elif tag == "script" and _attr(open_tag, "src"):
+            out.append(external(m))
+        else:
+            out.append(m.group(0))
+        last = m.end()
+    out.append(LINK_RE.sub(external, html[last:]))
+    return "".join(out)
+
+
+def validate_html(html: str) -> list:
+    issues = []
+    lower = html.lower()
+    if "<html" not in lower:
+        issues.append("missing <html> element")
+    elif "</html>" not in lower:
+        issues.append("document is truncated: missing </html>")
+    if "<body" in lower and "</body>" not in lower:
+        issues.append("missing </body>")
+    for tag in ("script", "style"):
+        opened = len(re.findall(rf"<{tag}\b", lower))
+        closed = lower.count(f"</{tag}")
+        if opened != closed:
+            issues.append(f"unbalanced <{tag}> tags ({opened} opened, {closed} closed)")
+    return issues
+
+
+def is_html(code: str) -> bool:
+    head = code[:1024].lower()
+    return "<!doctype html" in head or "<html" in head
+
+
+def postprocess(text: str, raw_bytes: int = None):
+    """Run raw model output through the artifact pipeline.
+
+    Returns ``(code, report)`` where ``report`` carries the size before and
+    after processing plus any completeness issues found in an HTML document.
+    ``raw_bytes`` is the size of the model's reply when ``text`` is not the
+    reply itself (a skeleton merged with slot content).
+    """
+    code = extract_code(text)
+    report = {"raw_bytes": len(text.encode()) if raw_bytes is None else raw_bytes, "bytes": 0, "complete": True, "issues": []}
+    if is_html(code):
+        code = minify_html(dedupe_assets(code))
+        report["issues"] = validate_html(code)
+        report["complete"] = not report["issues"]
+    report["bytes"] = len(code.encode())
+    return code, report
@@ -0,0 +1,134 @@
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+
+from agents.shared import read_states, remove_states, write_state
+
+APP_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IGNORED_THREADS = {"sampling-profiler", "event-bus-reader"}
+
+
+class SamplingProfiler:
+    """Statistical profiler for the next N requests of each worker.
+
+    While armed requests are in flight a background thread snapshots every
+    thread's stack each ``interval`` seconds.  Only stacks that pass through
+    the app's own code are kept, which drops idle pool threads and server
+    internals.  Results are exported in collapsed-stack format, ready for
+    flamegraph.pl or speedscope.
+
+    A profiling session is armed in every worker (the admin route broadcasts
+    it over the event bus).  Each worker writes its samples to a shared state
+    file when its sampler goes idle, and ``report``/``collapsed`` merge the
+    files of the current session, so any worker can answer for all of them.
+    """
+
+    def __init__(self):
+        self.remaining = 0
+        self.interval = 0.005
+        self.samples = Counter()
+        self.requests_profiled = 0
+        self.session = None
+        self._active = 0
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def arm(self, requests: int, interval_ms: float = 5.0, session: str = None) -> str:
+        with self._lock:
+            self.remaining = requests
+            self.interval = interval_ms / 1000
+            self.samples = Counter()
+            self.requests_profiled = 0
+            self.session = session or uuid.uuid4().hex[:12]
+        remove_states("profiles", keep_prefix=self.session)
+        self.flush()
+        return self.session
+
+    def begin(self) -> bool:
+        if not self.remaining:
+            return False
+        with self._lock:
+            if not self.remaining:
+                return False
+            self.remaining -= 1
+            self.requests_profiled += 1
+            self._active += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+                self._thread.start()
+        return True
+
+    def end(self):
+        with self._lock:
+            self._active -= 1
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if not self._active:
+                    self._thread = None
+                    break
+            skip = {t.ident for t in threading.enumerate() if t.name in IGNORED_THREADS}
+            stacks = []
+            for ident, frame in sys._current_frames().items():
+                if ident in skip:
+                    continue
+                stack = []
+                ours = False
+                while frame is not None:
+                    code = frame.f_code
+                    if code.co_filename.startswith(APP_ROOT) and "site-packages" not in code.co_filename:
+                        ours = True
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                if ours:
+                    stacks.append(";".join(reversed(stack)))
+            with self._lock:
+                self.samples.update(stacks)
+            time.sleep(self.interval)
+        self.flush()
+
+    def flush(self):
+        """Write this worker's status and samples for the current session."""
+        with self._lock:
+            if self.session is None:
+                return
+            data = {"status": self._status(), "samples": dict(self.samples)}
+            name = f"{self.session}-{os.getpid()}"
+        write_state("profiles", name, data)
+
+    def _status(self) -> dict:
+        return {
+            "remaining": self.remaining,
+            "requests_profiled": self.requests_profiled,
+            "in_flight": self._active,
+            "samples": sum(self.samples.values()),
+            "interval_ms": self.interval * 1000,
+        }
+
+    def _session_states(self) -> dict:
+        if self.session is None:
+            return {}
+        states = read_states("profiles", prefix=f"{self.session}-")
+        # This worker's live counters are fresher than its last flush.
+        with self._lock:
+            states[f"{self.session}-{os.getpid()}"] = {"status": self._status(), "samples": dict(self.samples)}
+        return states
+
+    def collapsed(self) -> str:
+        samples = Counter()
+        for state in self._session_states().values():
+            samples.update(state["samples"])
+        return "\n".join(f"{stack} {count}" for stack, count in samples.most_common())
+
+    def status(self) -> dict:
+        workers = {name.rsplit("-", 1)[1]: state["status"] for name, state in self._session_states().items()}
+        totals = {key: sum(w[key] for w in workers.values())
+                  for key in ("remaining", "requests_profiled", "in_flight", "samples")}
+        return {"session": self.session, **totals, "interval_ms": self.interval * 1000, "workers": workers}
+
+
+profiler = SamplingProfiler()
@@ -0,0 +1,59 @@
+import json
+import os
+import tempfile
+
+WORKER_STATE_DIR = os.getenv("WORKER_STATE_DIR", "/tmp/yodda-state")
+
+
+def write_state(kind: str, name: str, data: dict):
+    """Publish one worker's state as ``WORKER_STATE_DIR/<kind>/<name>.json``.
+
+    Written to a temporary file and renamed into place, so readers in other
+    workers never see a partial file.
+    """
+    directory = os.path.join(WORKER_STATE_DIR, kind)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(fd, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp, os.path.join(directory, f"{name}.json"))
+
+
+def read_states(kind: str, prefix: str = "") -> dict:
+    """Return ``{name: data}`` for every state file of ``kind`` whose name starts with ``prefix``."""
+    directory = os.path.join(WORKER_STATE_DIR, kind)
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return {}
+    states = {}
+    for file_name in names:
+        if not file_name.endswith(".json") or not file_name.startswith(prefix):
+            continue
+        try:
+            with open(os.path.join(directory, file_name)) as f:
+                states[file_name[:-5]] = json.load(f)
+        except (OSError, ValueError):
+            continue  # removed by a cleanup in another worker
+    return states
+
+
+def remove_states(kind: str, keep_prefix: str):
+    """Delete state files of ``kind`` that do not start with ``keep_prefix``."""
+    directory = os.path.join(WORKER_STATE_DIR, kind)
+    for name in read_states(kind):
+        if not name.startswith(keep_prefix):
+            try:
+                os.unlink(os.path.join(directory, f"{name}.json"))
+            except FileNotFoundError:
+                pass
+
+
+def worker_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
@@ -0,0 +1,273 @@
+import json
+import os
+import random
+import re
+import threading
+import zlib
+from array import array
+from bisect import bisect_left
+
+from config.settings import SIMILARITY_INDEX_PATH, SIMILARITY_THRESHOLD, SIMILARITY_CROSS_USER
+
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+MAX_CANDIDATES = 64
+MERGE_EVERY = 1024  # entries kept in the recent dict before merging into the sorted array
+INDEX_VERSION = 2
+SHARED = "*"
+_PRIME = (1 << 61) - 1
+_MASK = 0xFFFFFFFF
+
+_rng = random.Random(20240601)  # fixed so signatures stay valid across restarts and workers
+_PERMS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+
+STOPWORDS = {
+    "a", "an", "the", "and", "or", "with", "for", "of", "to", "in", "on", "my", "me", "is", "it",
+    "this", "that", "by", "from", "as", "at", "using", "based", "like", "your", "our",
+    "please", "build", "create", "make", "generate", "i", "want", "need", "some",
+    # Words nearly every request carries; they say nothing about what the app is.
+    "app", "apps", "application", "site", "website", "web", "page", "tool", "simple", "basic",
+    "list", "mode", "modes", "theme", "themed", "themes", "style", "styled", "ui", "design",
+}
+
+
+def _stem(word: str) -> str:
+    for suffix in ("ing", "ed", "er", "es", "s"):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            word = word[:-len(suffix)]
+            break
+    # "share"/"sharing" and "note"/"notes" should meet on the same stem.
+    if word.endswith("e") and len(word) >= 4:
+        word = word[:-1]
+    return word
+
+
+def normalize(query: str) -> set:
+    """Reduce a query to a bag of stemmed content words.
+
+    Word order is ignored on purpose: "todo app with dark mode" and
+    "dark themed todo list app" both reduce to {"todo", "dark"}.
+    """
+    words = re.findall(r"[a-z0-9]+", query.lower().replace("to-do", "todo"))
+    return {_stem(w) for w in words if w not in STOPWORDS}
+
+
+def token_hashes(query: str) -> list:
+    return sorted(zlib.crc32(token.encode()) for token in normalize(query))
+
+
+def minhash(hashes) -> array:
+    sig = array("I", [_MASK] * NUM_PERM)
+    for x in hashes:
+        for i, (a, b) in enumerate(_PERMS):
+            h = ((a * x + b) % _PRIME) & _MASK
+            if h < sig[i]:
+                sig[i] = h
+    return sig
+
+
+def band_hashes(sig) -> list:
+    """One 32-bit hash per LSH band, stored with each entry so loading never rehashes."""
+    return [zlib.crc32(sig[band * ROWS:(band + 1) * ROWS].tobytes(), band) for band in range(BANDS)]
+
+
+def _scope_hash(scope: str, theme: str, platform: str) -> int:
+    return zlib.crc32(f"{scope}\0{theme}\0{platform}".encode())
+
+
+def jaccard(a, b) -> float:
+    a, b = set(a), set(b)
+    return len(a & b) / len(a | b) if a or b else 0.0
+
+
+def _sorted_words(parts) -> array:
+    """Concatenate band words bucketed by their top byte, sorting one bucket at a time.
+
+    Sorting 16 words per entry in one go would need a list of every word as
+    Python ints; a bucket at a time keeps the transient memory small.
+    """
+    out = array("Q")
+    for part in parts:
+        out.extend(sorted(part))
+    return out
+
+
+def _merge_sorted(base: array, fresh: array) -> array:
+    if not base:
+        return fresh
+    out = array("Q")
+    last = 0
+    for word in fresh:
+        pos = bisect_left(base, word, last)
+        out.extend(base[last:pos])
+        out.append(word)
+        last = pos
+    out.extend(base[last:])
+    return out
+
+
+class SimilarityIndex:
+    """MinHash/LSH index of finished builds, scoped per (owner, theme, platform).
+
+    Entries are appended to a JSON-lines file as builds complete.  Every
+    worker loads the file in a background thread at startup and tails it on
+    each lookup, so a build written by one gunicorn worker is found by the
+    others on their next lookup.
+
+    Only what candidate scoring needs stays in memory: each entry's file
+    offset and token hashes, and one 64-bit word per LSH band packing a 32-bit
+    band hash with the entry number.  Band words live in a sorted array
+    searched with bisect; new entries sit in a small dict until ``MERGE_EVERY``
+    of them have accumulated.  Candidates are re-scored by exact Jaccard over
+    their tokens and the match itself is read back from the file.
+    """
+
+    def __init__(self, path: str = SIMILARITY_INDEX_PATH, threshold: float = SIMILARITY_THRESHOLD,
+                 cross_user: bool = SIMILARITY_CROSS_USER):
+        self.path = path
+        self.threshold = threshold
+        self.cross_user = cross_user
+        self.offsets = array("Q")
+        self.token_ends = array("I")
+        self.tokens = array("I")
+        self.words = array("Q")  # sorted (band key << 32 | entry)
+        self.recent = {}
+        self._recent_entries = 0
+        self.loaded = False
+        self._offset = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def _scopes(self, owner: str):
+        return (owner, SHARED) if self.cross_user else (owner,)
+
+    def _keys(self, owner: str, theme: str, platform: str, bands) -> list:
+        keys = []
+        for scope in self._scopes(owner):
+            salt = _scope_hash(scope, theme, platform)
+            keys.extend(h ^ salt for h in bands)
+        return keys
+
+    def _insert(self, offset: int, record: dict, parts: list):
+        idx = len(self.offsets)
+        self.offsets.append(offset)
+        self.tokens.extend(record["tokens"])
+        self.token_ends.append(len(self.tokens))
+        for key in self._keys(record["owner"], record["theme"], record["platform"], record["bands"]):
+            word = key << 32 | idx
+            parts[word >> 56].append(word)
+
+    def load(self):
+        """Read the whole index file; lookups find nothing until this has run."""
+        self.refresh()
+        self.loaded = True
+
+    def refresh(self):
+        """Load entries appended to the index file since the last call."""
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            return
+        if size <= self._offset:
+            return
+        with self._lock:
+            parts = [array("Q") for _ in range(256)]
+            added = 0
+            with open(self.path, "rb") as f:
+                f.seek(self._offset)
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break  # another worker is mid-write; pick it up next time
+                    offset = self._offset
+                    self._offset += len(line)
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    # Entries from before owners were recorded are never matched.
+                    if record.get("v") != INDEX_VERSION or len(record["bands"]) != BANDS:
+                        continue
+                    self._insert(offset, record, parts)
+                    added += 1
+            if added >= MERGE_EVERY:
+                self.words = _merge_sorted(self.words, _sorted_words(parts))
+                return
+            for part in parts:
+                for word in part:
+                    self.recent.setdefault(word >> 32, []).append(word & _MASK)
+            self._recent_entries += added
+            if self._recent_entries >= MERGE_EVERY:
+                fresh = array("Q", sorted(key << 32 | idx for key, ids in self.recent.items() for idx in ids))
+                self.words = _merge_sorted(self.words, fresh)
+                self.recent = {}
+                self._recent_entries = 0
+
+    def add(self, build_id: str, query: str, theme: str, platform: str, path: str, owner: str):
+        hashes = token_hashes(query)
+        record = {
+            "v": INDEX_VERSION, "id": build_id, "owner": owner, "query": query, "theme": theme,
+            "platform": platform, "path": path, "tokens": hashes, "bands": band_hashes(minhash(hashes)),
+        }
+        line = (json.dumps(record) + "\n").encode()
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # One O_APPEND write per record keeps lines whole across workers; every
+        # worker, this one included, picks it up on its next lookup.
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line)
+        finally:
+            os.close(fd)
+
+    def _candidates(self, keys) -> set:
+        found = set()
+        for key in keys:
+            lo = bisect_left(self.words, key << 32)
+            hi = bisect_left(self.words, (key + 1) << 32, lo)
+            # Newest builds first; hot buckets are capped to bound latency.
+            for i in range(max(lo, hi - MAX_CANDIDATES), hi):
+                found.add(self.words[i] & _MASK)
+            found.update(self.recent.get(key, ())[-MAX_CANDIDATES:])
+        return found
+
+    def _read(self, idx: int) -> dict:
+        with open(self.path, "rb") as f:
+            f.seek(self.offsets[idx])
+            return json.loads(f.readline())
+
+    def lookup(self, query: str, theme: str, platform: str, owner: str, threshold: float = None):
+        """Return ``(entry, score)`` for the closest earlier build, or ``None``.
+
+        Only ``owner``'s builds are searched unless the index was created with
+        ``cross_user``.  ``score`` is the exact Jaccard similarity of the two
+        queries' token sets.
+        """
+        if not self.loaded:
+            return None  # still loading at startup; never make a request wait for it
+        self.refresh()
+        threshold = self.threshold if threshold is None else threshold
+        hashes = token_hashes(query)
+        if not hashes:
+            return None
+        keys = self._keys(owner, theme, platform, band_hashes(minhash(hashes)))
+        with self._lock:
+            scored = []
+            for idx in self._candidates(keys):
+                start = self.token_ends[idx - 1] if idx else 0
+                score = jaccard(hashes, self.tokens[start:self.token_ends[idx]])
+                if score >= threshold:
+                    scored.append((score, idx))
+        for score, idx in sorted(scored, reverse=True):
+            entry = self._read(idx)
+            # Band hashes are 32-bit, so confirm the scope before trusting a hit.
+            if entry["theme"] == theme and entry["platform"] == platform and (
+                    entry["owner"] == owner or self.cross_user):
+                return entry, score
+        return None
+
+
+similarity_index = SimilarityIndex()
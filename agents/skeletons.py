@@ -0,0 +1,204 @@
+import html
+import json
+import os
+import re
+import tempfile
+from functools import lru_cache
+
+from agents.postprocess import extract_code
+from config.database import GAMMA_THEMES, PLATFORMS
+from config.settings import SKELETON_DIR
+
+SLOT_RE = re.compile(r"\{\{slot:([a-z_]+)\}\}")
+OPTIONAL_SLOTS = {"styles", "script"}
+
+# Platform chrome: viewport, base typography and navigation placement.
+PLATFORM_SHELLS = {
+    "web": {
+        "viewport": "width=device-width, initial-scale=1.0",
+        "css": "body{margin:0}.app-nav{position:sticky;top:0;display:flex;gap:1rem;padding:1rem 2rem}"
+               ".app-main{max-width:1200px;margin:0 auto;padding:2rem}",
+    },
+    "desktop": {
+        "viewport": "width=device-width, initial-scale=1.0",
+        "css": "body{margin:0;min-width:960px;user-select:none}"
+               ".app-titlebar{height:32px;display:flex;align-items:center;padding:0 12px;font-size:13px;-webkit-app-region:drag}"
+               ".app-nav{display:flex;flex-direction:column;gap:.5rem;position:fixed;top:32px;bottom:0;width:220px;padding:1rem}"
+               ".app-main{margin-left:220px;padding:2rem}",
+    },
+    "android": {
+        "viewport": "width=device-width, initial-scale=1.0, maximum-scale=1.0",
+        "css": "body{margin:0;font-family:Roboto,system-ui,sans-serif;padding-bottom:64px}"
+               ".app-nav{position:fixed;bottom:0;left:0;right:0;height:64px;display:flex;justify-content:space-around;align-items:center}"
+               ".app-main{padding:16px}",
+    },
+    "ios": {
+        "viewport": "width=device-width, initial-scale=1.0, viewport-fit=cover",
+        "css": "body{margin:0;font-family:-apple-system,'SF Pro Text',system-ui,sans-serif;"
+               "padding:env(safe-area-inset-top) env(safe-area-inset-right) calc(56px + env(safe-area-inset-bottom)) env(safe-area-inset-left)}"
+               ".app-nav{position:fixed;bottom:0;left:0;right:0;height:56px;padding-bottom:env(safe-area-inset-bottom);"
+               "display:flex;justify-content:space-around;align-items:center;backdrop-filter:blur(20px)}"
+               ".app-main{padding:16px}",
+    },
+}
+
+# Theme layouts: section structure plus the slots the model has to fill.
+THEME_LAYOUTS = {
+    "website-builder": {
+        "css": ":root{--bg:#0f172a;--fg:#e2e8f0;--accent:#38bdf8}section{padding:4rem 0}"
+               ".grid{display:grid;grid-template-columns:repeat(auto-fit,minmax(240px,1fr));gap:1.5rem}",
+        "body": '<section id="hero">{{slot:hero}}</section>'
+                '<section id="features"><div class="grid">{{slot:features}}</div></section>'
+                '<section id="pricing"><div class="grid">{{slot:pricing}}</div></section>'
+                '<section id="contact">{{slot:contact}}</section>',
+    },
+    "presentation-mode": {
+        "css": ":root{--bg:#111827;--fg:#f9fafb;--accent:#a78bfa}.slide{min-height:80vh;display:none;flex-direction:column;justify-content:center}"
+               ".slide.active{display:flex}.deck-controls{display:flex;gap:1rem;justify-content:center}",
+        "body": '<div class="deck">{{slot:slides}}</div>'
+                '<div class="deck-controls"><button data-step="-1">&larr;</button><button data-step="1">&rarr;</button></div>',
+        "script": "(()=>{const s=[...document.querySelectorAll('.slide')];let i=0;const show=n=>{i=(n+s.length)%s.length;"
+                  "s.forEach((e,k)=>e.classList.toggle('active',k===i))};document.querySelectorAll('[data-step]').forEach(b=>"
+                  "b.addEventListener('click',()=>show(i+ +b.dataset.step)));document.addEventListener('keydown',e=>{"
+                  "if(e.key==='ArrowRight')show(i+1);if(e.key==='ArrowLeft')show(i-1)});s.length&&show(0)})();",
+    },
+    "saas-boilerplate": {
+        "css": ":root{--bg:#020617;--fg:#e5e7eb;--accent:#22c55e}section{padding:3rem 0}"
+               ".grid{display:grid;grid-template-columns:repeat(auto-fit,minmax(220px,1fr));gap:1.5rem}"
+               "form{display:flex;flex-direction:column;gap:.75rem;max-width:360px}",
+        "body": '<section id="hero">{{slot:hero}}</section>'
+                '<section id="auth">{{slot:auth}}</section>'
+                '<section id="features"><div class="grid">{{slot:features}}</div></section>'
+                '<section id="pricing"><div class="grid">{{slot:pricing}}</div></section>',
+    },
+    "dashboard-suite": {
+        "css": ":root{--bg:#0b1120;--fg:#cbd5e1;--accent:#f59e0b}.filters{display:flex;flex-wrap:wrap;gap:.75rem;margin-bottom:1.5rem}"
+               ".cards{display:grid;grid-template-columns:repeat(auto-fit,minmax(200px,1fr));gap:1rem}"
+               ".charts{display:grid;grid-template-columns:repeat(auto-fit,minmax(320px,1fr));gap:1rem;margin-top:1.5rem}",
+        "body": '<div class="filters">{{slot:filters}}</div>'
+                '<div class="cards">{{slot:cards}}</div>'
+                '<div class="charts">{{slot:charts}}</div>',
+    },
+    "landing-funnel": {
+        "css": ":root{--bg:#0c0a09;--fg:#fafaf9;--accent:#f43f5e}section{padding:3.5rem 0;text-align:center}"
+               ".grid{display:grid;grid-template-columns:repeat(auto-fit,minmax(220px,1fr));gap:1.5rem}"
+               ".cta{font-size:1.25rem;padding:1rem 2.5rem;border-radius:999px}",
+        "body": '<section id="hero">{{slot:hero}}</section>'
+                '<section id="social-proof"><div class="grid">{{slot:social_proof}}</div></section>'
+                '<section id="benefits"><div class="grid">{{slot:benefits}}</div></section>'
+                '<section id="cta">{{slot:cta}}</section>',
+    },
+    "knowledge-base": {
+        "css": ":root{--bg:#0f172a;--fg:#e2e8f0;--accent:#14b8a6}.kb{display:grid;grid-template-columns:260px 1fr;gap:2rem}"
+               ".kb-sidebar{position:sticky;top:1rem;align-self:start}@media(max-width:720px){.kb{grid-template-columns:1fr}}",
+        "body": '<div class="kb"><aside class="kb-sidebar">{{slot:sidebar}}</aside>'
+                '<article class="kb-content">{{slot:content}}</article></div>',
+    },
+}
+
+SHARED_CSS = ("*{box-sizing:border-box}body{background:var(--bg);color:var(--fg);line-height:1.6}"
+              "a{color:var(--accent)}button,.button{background:var(--accent);color:var(--bg);border:0;"
+              "padding:.6rem 1.2rem;border-radius:6px;cursor:pointer}")
+
+
+def _render(theme: str, platform: str) -> str:
+    layout = THEME_LAYOUTS[theme]
+    shell = PLATFORM_SHELLS[platform]
+    titlebar = '<div class="app-titlebar">{{slot:title}}</div>' if platform == "desktop" else ""
+    return (
+        "<!DOCTYPE html>"
+        '<html lang="en"><head><meta charset="UTF-8">'
+        f'<meta name="viewport" content="{shell["viewport"]}">'
+        "<title>{{slot:title}}</title>"
+        f"<style>{SHARED_CSS}{shell['css']}{layout['css']}</style>"
+        "<style>{{slot:styles}}</style>"
+        "</head><body>"
+        f"{titlebar}"
+        '<nav class="app-nav">{{slot:nav}}</nav>'
+        f'<main class="app-main">{layout["body"]}</main>'
+        f"<script>{layout.get('script', '')}</script>"
+        "<script>{{slot:script}}</script>"
+        "</body></html>"
+    )
+
+
+def has_skeleton(theme: str, platform: str) -> bool:
+    return theme in THEME_LAYOUTS and platform in PLATFORM_SHELLS
+
+
+def build_library(directory: str = SKELETON_DIR):
+    """Write every theme x platform skeleton to ``directory`` (run offline or at first use).
+
+    Each file is written to a temporary name and renamed into place, so a
+    worker loading a skeleton while another builds the library never reads
+    a partial file.
+    """
+    os.makedirs(directory, exist_ok=True)
+    for theme in (t["id"] for t in GAMMA_THEMES):
+        for platform in PLATFORMS:
+            fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            with os.fdopen(fd, "w") as f:
+                f.write(_render(theme, platform))
+            os.replace(tmp, os.path.join(directory, f"{theme}--{platform}.html"))
+
+
+@lru_cache(maxsize=None)
+def load_skeleton(theme: str, platform: str) -> str:
+    path = os.path.join(SKELETON_DIR, f"{theme}--{platform}.html")
+    if not os.path.exists(path):
+        build_library()
+    with open(path) as f:
+        return f.read()
+
+
+def slot_names(skeleton: str) -> list:
+    return list(dict.fromkeys(SLOT_RE.findall(skeleton)))
+
+
+def content_slots(skeleton: str) -> list:
+    return [name for name in slot_names(skeleton) if name not in OPTIONAL_SLOTS]
+
+
+def slot_prompt(skeleton: str) -> str:
+    names = slot_names(skeleton)
+    return (
+        "The page layout, navigation shell and base styles already exist; do not write a full document. "
+        f"Return only a JSON object with exactly these keys: {', '.join(names)}. "
+        "'title' is plain text, 'styles' is extra CSS, 'script' is extra JavaScript, "
+        "every other value is an HTML fragment for that section. Keep the fragments concise."
+    )
+
+
+def merge(skeleton: str, response: str):
+    """Fill the skeleton's slots from the model's JSON reply.
+
+    Returns ``(page, missing)`` where ``missing`` lists the content slots the
+    reply left out or empty (``styles`` and ``script`` are optional).  Returns
+    ``None`` when the reply is not a JSON object (often because it was cut off
+    at the token limit); the caller must not publish it.
+    """
+    try:
+        slots = json.loads(extract_code(response))
+    except ValueError:
+        return None
+    if not isinstance(slots, dict):
+        return None
+
+    def value(name):
+        value = slots.get(name) or ""
+        if not isinstance(value, str):
+            value = "".join(map(str, value)) if isinstance(value, list) else str(value)
+        return value
+
+    def fill(m):
+        if m.group(1) == "title":
+            return html.escape(value("title"))
+        return value(m.group(1))
+
+    missing = [name for name in content_slots(skeleton) if not value(name).strip()]
+    return SLOT_RE.sub(fill, skeleton), missing
+
+
+if __name__ == "__main__":
+    build_library()
+    print(f"Wrote {len(THEME_LAYOUTS) * len(PLATFORM_SHELLS)} skeletons to {SKELETON_DIR}/")
@@ -0,0 +1,156 @@
+import os
+import re
+import threading
+from collections import deque
+
+from agents.shared import read_states, worker_alive, write_state
+from config.settings import MODEL_TIER_POLICY
+
+# Signals that a request needs more than a static page, with the exact word
+# forms that count for each; prefixes would score "author" as auth.
+COMPLEX_FEATURES = {
+    "auth": (0.12, {"auth", "authentication", "authenticate", "authenticated", "oauth", "2fa"}),
+    "login": (0.12, {"login", "logins", "logout", "signin"}),
+    "signup": (0.1, {"signup", "signups", "register", "registration"}),
+    "database": (0.15, {"database", "databases", "db", "persistence", "persistent"}),
+    "crud": (0.12, {"crud"}),
+    "api": (0.1, {"api", "apis", "graphql", "backend"}),
+    "payment": (0.12, {"payment", "payments", "stripe", "billing"}),
+    "checkout": (0.12, {"checkout"}),
+    "cart": (0.1, {"cart", "carts"}),
+    "realtime": (0.15, {"realtime"}),
+    "chat": (0.12, {"chat", "chats", "chatting", "messaging", "messenger"}),
+    "websocket": (0.15, {"websocket", "websockets"}),
+    "chart": (0.08, {"chart", "charts", "charting"}),
+    "graph": (0.08, {"graph", "graphs"}),
+    "filter": (0.06, {"filter", "filters", "filtering"}),
+    "search": (0.06, {"search", "searching", "searchable"}),
+    "drag": (0.1, {"drag", "draggable", "dragging"}),
+    "editor": (0.12, {"editor", "editors", "editing", "wysiwyg"}),
+    "game": (0.15, {"game", "games", "gaming"}),
+    "3d": (0.15, {"3d", "threejs", "webgl"}),
+    "canvas": (0.1, {"canvas"}),
+    "animation": (0.06, {"animation", "animations", "animated"}),
+    "upload": (0.08, {"upload", "uploads", "uploading"}),
+    "calendar": (0.08, {"calendar", "calendars", "scheduling", "scheduler"}),
+    "map": (0.08, {"map", "maps", "mapping", "geolocation"}),
+    "admin": (0.08, {"admin", "admins", "administrator"}),
+    "role": (0.1, {"role", "roles", "permission", "permissions", "rbac"}),
+    "offline": (0.1, {"offline", "pwa"}),
+    "sync": (0.08, {"sync", "syncing", "synchronization", "synchronize"}),
+    "multi": (0.06, {"multi", "multiuser", "multiplayer", "multitenant"}),
+    "dashboard": (0.08, {"dashboard", "dashboards"}),
+    "kanban": (0.1, {"kanban"}),
+    "table": (0.05, {"table", "tables", "datagrid", "spreadsheet"}),
+}
+FEATURE_WORDS = {word: feature for feature, (_, words) in COMPLEX_FEATURES.items() for word in words}
+THEME_WEIGHTS = {
+    "landing-funnel": 0.0, "website-builder": 0.05, "knowledge-base": 0.08,
+    "presentation-mode": 0.08, "saas-boilerplate": 0.15, "dashboard-suite": 0.18,
+}
+PLATFORM_WEIGHTS = {"web": 0.0, "desktop": 0.08, "android": 0.1, "ios": 0.1}
+
+
+def score_complexity(query: str, theme: str, platform: str) -> float:
+    """Heuristic 0..1 complexity score for a build request."""
+    words = re.findall(r"[a-z0-9]+", query.lower())
+    score = min(len(words) / 120, 0.25)
+    for feature in {FEATURE_WORDS[w] for w in words if w in FEATURE_WORDS}:
+        score += COMPLEX_FEATURES[feature][0]
+    score += THEME_WEIGHTS.get(theme, 0.1)
+    score += PLATFORM_WEIGHTS.get(platform, 0.1)
+    return round(min(score, 1.0), 3)
+
+
+class ModelRoute:
+    __slots__ = ("score", "tier", "model", "large_model", "can_escalate")
+
+    def __init__(self, score: float, tier: str, model: str, large_model: str, can_escalate: bool):
+        self.score = score
+        self.tier = tier
+        self.model = model
+        self.large_model = large_model
+        self.can_escalate = can_escalate
+
+
+def route_model(models: dict, score: float, user_tier: str) -> ModelRoute:
+    """Pick the fast or large model from ``models`` for a user's plan.
+
+    ``MODEL_TIER_POLICY[user_tier]["large_above"]`` is the score at which the
+    large model is used up front (``None`` never does); ``escalate`` allows a
+    retry on the large model when the fast model's output fails validation.
+    """
+    policy = MODEL_TIER_POLICY.get(user_tier, MODEL_TIER_POLICY["FREE"])
+    large_above = policy.get("large_above")
+    distinct = models["fast"] != models["large"]
+    if distinct and large_above is not None and score >= large_above:
+        return ModelRoute(score, "large", models["large"], models["large"], False)
+    return ModelRoute(score, "fast", models["fast"], models["large"], distinct and policy.get("escalate", False))
+
+
+class TieringStats:
+    """Per-tier latency, retry and escalation counters, merged across workers.
+
+    Each worker keeps its own counters and publishes them as a shared state
+    file after every call, so ``report`` can answer for every live worker.
+    A same-model retry is counted under ``retries``, not as another request,
+    so ``escalation_rate`` stays escalations per first attempt on the fast tier.
+    """
+
+    def __init__(self, window: int = 1000):
+        self.window = window
+        self.tiers = {}
+        self.escalations = 0
+        self._lock = threading.Lock()
+
+    def record(self, tier: str, latency_ms: float, escalated: bool = False, retry: bool = False):
+        with self._lock:
+            stats = self.tiers.setdefault(tier, {"requests": 0, "retries": 0, "latencies": deque(maxlen=self.window)})
+            stats["retries" if retry else "requests"] += 1
+            stats["latencies"].append(latency_ms)
+            if escalated:
+                self.escalations += 1
+            write_state("tiering", str(os.getpid()), self._state())
+
+    def _state(self) -> dict:
+        return {
+            "tiers": {tier: {**stats, "latencies": list(stats["latencies"])} for tier, stats in self.tiers.items()},
+            "escalations": self.escalations,
+        }
+
+    def _worker_states(self) -> list:
+        states = read_states("tiering")
+        # This worker's live counters are fresher than its last write.
+        with self._lock:
+            states[str(os.getpid())] = self._state()
+        return [state for pid, state in states.items() if worker_alive(int(pid))]
+
+    def report(self) -> dict:
+        merged = {}
+        escalations = 0
+        for state in self._worker_states():
+            escalations += state["escalations"]
+            for tier, stats in state["tiers"].items():
+                total = merged.setdefault(tier, {"requests": 0, "retries": 0, "latencies": []})
+                total["requests"] += stats["requests"]
+                total["retries"] += stats["retries"]
+                total["latencies"].extend(stats["latencies"])
+        tiers = {}
+        for tier, stats in merged.items():
+            latencies = sorted(stats["latencies"])
+            tiers[tier] = {
+                "requests": stats["requests"],
+                "retries": stats["retries"],
+                "p50_ms": round(latencies[len(latencies) // 2], 1),
+                "p95_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 1),
+                "mean_ms": round(sum(latencies) / len(latencies), 1),
+            }
+        fast = merged.get("fast", {}).get("requests", 0)
+        return {
+            "tiers": tiers,
+            "escalations": escalations,
+            "escalation_rate": round(escalations / fast, 3) if fast else 0.0,
+        }
+
+
+tiering_stats = TieringStats()
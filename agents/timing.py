@@ -0,0 +1,77 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import perf_counter
+
+_current = ContextVar("request_timing", default=None)
+
+
+class RequestTiming:
+    def __init__(self):
+        self.spans = []
+
+    def add(self, name: str, ms: float):
+        self.spans.append((name, ms))
+
+    def as_dict(self) -> dict:
+        totals = {}
+        for name, ms in self.spans:
+            totals[name] = round(totals.get(name, 0.0) + ms, 2)
+        return totals
+
+    def header(self) -> str:
+        return ", ".join(f"{name};dur={ms:.1f}" for name, ms in self.spans)
+
+
+def current_timing():
+    return _current.get()
+
+
+@contextmanager
+def span(name: str):
+    """Time a named stage of the current request; a no-op outside TimingMiddleware."""
+    timing = _current.get()
+    if timing is None:
+        yield
+        return
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        timing.add(name, (perf_counter() - start) * 1000)
+
+
+class TimingMiddleware:
+    """Collect spans for each HTTP request and report them as ``Server-Timing``.
+
+    Plain ASGI rather than ``BaseHTTPMiddleware`` so the only per-request cost
+    is one context variable and a header append.
+    """
+
+    def __init__(self, app, profiler=None):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timing = RequestTiming()
+        token = _current.set(timing)
+        profiled = self.profiler is not None and self.profiler.begin()
+        start = perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                timing.add("total", (perf_counter() - start) * 1000)
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", timing.header().encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            if profiled:
+                self.profiler.end()
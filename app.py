@@ -7,6 +7,7 @@ import requests
 import json
 import logging
 from datetime import datetime, timedelta
+from time import perf_counter
 from typing import Optional
 
 import jwt
@@ -18,6 +19,9 @@ from dotenv import load_dotenv
 import uvicorn
 
 from auth import get_password_hash, verify_password
+from agents.postprocess import postprocess
+from agents.admission import admission, run_llm_bound, run_in_auth_lane
+from agents.tiering import route_model, score_complexity, tiering_stats
 
 sys.path.append(".")
 
@@ -40,6 +44,8 @@ API_PROVIDER_CONFIG = {
     "google_gemini": {"endpoint": "https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-pro-latest:generateContent", "model": "gemini-1.5-pro-latest"},
     "google_ai_studio": {"endpoint": "https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-flash-latest:generateContent", "model": "gemini-1.5-flash-latest"}
 }
+# Environment fallback: flash for simple requests, pro for complex ones (values are API_PROVIDER_CONFIG keys).
+GEMINI_TIERS = {"fast": "google_ai_studio", "large": "google_gemini"}
 
 class UserRegister(BaseModel):
     name: str
@@ -140,7 +146,10 @@ def get_current_admin_user(current_user: dict = Depends(get_current_user)) -> di
     return current_user
 
 @router.post("/auth/register")
-def register(user: UserRegister):
+async def register(user: UserRegister):
+    return await run_in_auth_lane(register_user, user)
+
+def register_user(user: UserRegister):
     if user.email in DataStore["users"]: raise HTTPException(status_code=400, detail="Email already registered")
     password_hash = get_password_hash(user.password)
     DataStore["users"][user.email] = {
@@ -155,7 +164,10 @@ def register(user: UserRegister):
     return {"token": create_jwt_token(user.email)}
 
 @router.post("/auth/login")
-def login(credentials: UserLogin):
+async def login(credentials: UserLogin):
+    return await run_in_auth_lane(login_user, credentials)
+
+def login_user(credentials: UserLogin):
     user = DataStore["users"].get(credentials.email)
     if not user:
         raise HTTPException(status_code=401, detail="Invalid credentials")
@@ -179,56 +191,81 @@ def login(credentials: UserLogin):
 def get_me(current_user: dict = Depends(get_current_user)): return current_user
 
 @api_router.post("/swarm/orchestrate")
-def orchestrate(req: OrchestrateRequest, current_user: dict = Depends(get_current_user)):
-    logging.info("Orchestration started.")
-    text_plugin = next((p for p in current_user.get("plugins", []) if p.get('type') == 'text'), None)
-    
-    if not text_plugin and Config.GOOGLE_GEMINI_API_KEY:
-        logging.info("Using fallback Google Gemini API key from environment.")
-        text_plugin = {"provider": "google_gemini", "key": Config.GOOGLE_GEMINI_API_KEY}
+async def orchestrate(req: OrchestrateRequest, current_user: dict = Depends(get_current_user)):
+    return await run_llm_bound(run_orchestrate, req, current_user)
 
-    if not text_plugin: 
-        logging.error("No API key configured or found in environment.")
-        raise HTTPException(status_code=400, detail="No API key configured or found in environment.")
-    
-    provider = text_plugin['provider']
-    logging.info(f"Using provider: {provider}")
+def call_provider(provider: str, key: str, prompt: str) -> str:
     config = API_PROVIDER_CONFIG.get(provider)
     if not config: 
         logging.error(f"Provider '{provider}' not configured.")
         raise HTTPException(status_code=500, detail=f"Provider '{provider}' not configured.")
-    
+
     headers = {"Content-Type": "application/json"}
-    prompt = f"Generate a complete, single-file HTML document for a '{req.platform}' application. Request: '{req.query}'. Theme: '{req.theme}'. The file must be self-contained with all CSS and JavaScript. Respond with only the raw HTML code, no markdown."
     endpoint = config['endpoint']
 
     if provider in ["google_gemini", "google_ai_studio"]:
-        endpoint = f"{endpoint}?key={text_plugin['key']}"
+        endpoint = f"{endpoint}?key={key}"
         payload = {"contents": [{"parts": [{"text": prompt}]}]}
     else:
-        headers["Authorization"] = f"Bearer {text_plugin['key']}"
+        headers["Authorization"] = f"Bearer {key}"
         payload = {"model": config['model'], "messages": [{"role": "user", "content": prompt}], "temperature": 0.7}
 
-    try:
-        logging.info(f"Making API call to {endpoint}")
+    logging.info(f"Making API call to {config['endpoint']}")
+    with admission.slot(provider):
         response = requests.post(endpoint, headers=headers, json=payload, timeout=45)
-        response.raise_for_status()
-        api_response = response.json()
-        logging.info(f"Raw API response received: {json.dumps(api_response, indent=2)}")
-
-        generated_code = None
-        if provider in ["google_gemini", "google_ai_studio"]:
-            generated_code = api_response.get('candidates', [{}])[0].get('content', {}).get('parts', [{}])[0].get('text', '')
-        else:
-            generated_code = api_response.get('choices', [{}])[0].get('message', {}).get('content', '')
-        
-        if not generated_code:
-            logging.error("Failed to extract generated_code from API response.")
-            raise HTTPException(status_code=500, detail="Failed to parse generated code from API response.")
+    response.raise_for_status()
+    api_response = response.json()
+    logging.info(f"Raw API response received: {json.dumps(api_response, indent=2)}")
+
+    generated_code = None
+    if provider in ["google_gemini", "google_ai_studio"]:
+        generated_code = api_response.get('candidates', [{}])[0].get('content', {}).get('parts', [{}])[0].get('text', '')
+    else:
+        generated_code = api_response.get('choices', [{}])[0].get('message', {}).get('content', '')
+
+    if not generated_code:
+        logging.error("Failed to extract generated_code from API response.")
+        raise HTTPException(status_code=500, detail="Failed to parse generated code from API response.")
+    return generated_code
+
+def run_orchestrate(req: OrchestrateRequest, current_user: dict):
+    logging.info("Orchestration started.")
+    text_plugin = next((p for p in current_user.get("plugins", []) if p.get('type') == 'text'), None)
+    route = None
+
+    if not text_plugin and Config.GOOGLE_GEMINI_API_KEY:
+        score = score_complexity(req.query, req.theme, req.platform)
+        route = route_model(GEMINI_TIERS, score, current_user.get("tier", "FREE"))
+        logging.info(f"Using fallback Google Gemini API key from environment ({route.model}, complexity {score}).")
+        text_plugin = {"provider": route.model, "key": Config.GOOGLE_GEMINI_API_KEY}
+
+    if not text_plugin: 
+        logging.error("No API key configured or found in environment.")
+        raise HTTPException(status_code=400, detail="No API key configured or found in environment.")
+    
+    provider = text_plugin['provider']
+    logging.info(f"Using provider: {provider}")
+    prompt = f"Generate a complete, single-file HTML document for a '{req.platform}' application. Request: '{req.query}'. Theme: '{req.theme}'. The file must be self-contained with all CSS and JavaScript. Respond with only the raw HTML code, no markdown."
 
+    try:
+        start = perf_counter()
+        generated_code, artifact = postprocess(call_provider(provider, text_plugin['key'], prompt))
+        if route:
+            tiering_stats.record(route.tier, (perf_counter() - start) * 1000)
+            if not artifact["complete"] and route.can_escalate:
+                logging.warning(f"Output from {provider} failed validation; escalating to {route.large_model}.")
+                provider = route.large_model
+                start = perf_counter()
+                generated_code, artifact = postprocess(call_provider(provider, text_plugin['key'], prompt))
+                tiering_stats.record("large", (perf_counter() - start) * 1000, escalated=True)
+
+        if not artifact["complete"]:
+            logging.warning(f"Generated document looks incomplete: {'; '.join(artifact['issues'])}")
         logging.info("Successfully extracted generated code.")
-        return {"status": "BUILD_COMPLETED", "generated_code": generated_code.strip("```html").strip("```").strip()}
+        return {"status": "BUILD_COMPLETED", "generated_code": generated_code, "artifact": artifact, "provider": provider}
 
+    except HTTPException:
+        raise
     except requests.exceptions.RequestException as e: 
         logging.error(f"API call failed: {str(e)}")
         raise HTTPException(status_code=500, detail=f"API call failed: {str(e)}")
@@ -246,7 +283,10 @@ def manage_plugin(req: AdminPluginRequest, admin_user: dict = Depends(get_curren
     return {"message": f"API key for '{req.provider}' saved."}
 
 @api_router.post("/admin/validate_key")
-def validate_key(req: ValidateRequest, admin_user: dict = Depends(get_current_admin_user)):
+async def validate_key(req: ValidateRequest, admin_user: dict = Depends(get_current_admin_user)):
+    return await run_llm_bound(run_validate_key, req)
+
+def run_validate_key(req: ValidateRequest):
     config = API_PROVIDER_CONFIG.get(req.provider)
     if not config: raise HTTPException(status_code=400, detail="Invalid provider.")
     
@@ -261,7 +301,8 @@ def validate_key(req: ValidateRequest, admin_user: dict = Depends(get_current_ad
         payload = {"model": config['model'], "messages": [{"role": "user", "content": "Test"}], "max_tokens": 5}
     
     try:
-        response = requests.post(endpoint, headers=headers, json=payload, timeout=10)
+        with admission.slot(req.provider):
+            response = requests.post(endpoint, headers=headers, json=payload, timeout=10)
         response.raise_for_status()
         return {"message": "API key is valid."}
     except requests.exceptions.RequestException as e:
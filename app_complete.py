@@ -1,12 +1,20 @@
 import os
+import asyncio
+import threading
 import uvicorn
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.staticfiles import StaticFiles
 from routes import auth, admin, payments, plugins, swarm, themes
 from datetime import datetime
+from agents.events import bus
+from agents.admission import admission
+from agents.profiler import profiler
+from agents.similarity import similarity_index
+from agents.timing import TimingMiddleware
 from config.database import users_db
-from config.settings import NVIDIA_API_KEY, ADMIN_SETUP_DONE
+from config.settings import NVIDIA_API_KEY, ADMIN_SETUP_DONE, TIMING_ENABLED
 
 app = FastAPI(title="YODDA Premium v3.0 COMPLETE", version="3.0.0")
 
@@ -17,10 +25,27 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"]
 )
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+if TIMING_ENABLED:
+    app.add_middleware(TimingMiddleware, profiler=profiler)
 
 os.makedirs("builds", exist_ok=True)
 app.mount("/builds", StaticFiles(directory="builds"), name="builds")
 
+@app.on_event("startup")
+async def start_event_bus():
+    bus.start(asyncio.get_running_loop())
+
+@app.on_event("startup")
+def load_similarity_index():
+    # A large index takes seconds to read; load it beside the server rather
+    # than inside a request or ahead of gunicorn's boot timeout.
+    threading.Thread(target=similarity_index.load, name="similarity-load", daemon=True).start()
+
+@app.on_event("shutdown")
+def stop_event_bus():
+    bus.stop()
+
 app.include_router(auth.router)
 app.include_router(admin.router)
 app.include_router(payments.router)
@@ -28,8 +53,10 @@ app.include_router(plugins.router)
 app.include_router(swarm.router)
 app.include_router(themes.router)
 
+# Health and catalog routes are async and never touch a thread pool, so they
+# keep answering while LLM-bound work is backed up.
 @app.get("/")
-def root():
+async def root():
     return {
         "message": "YODDA Premium v3.0 COMPLETE",
         "version": "3.0.0",
@@ -38,7 +65,7 @@ def root():
     }
 
 @app.get("/health")
-def health():
+async def health():
     return {
         "status": "healthy",
         "version": "3.0.0",
@@ -46,6 +73,7 @@ def health():
         "users": len(users_db),
         "timestamp": datetime.utcnow().isoformat(),
         "nvidia_ready": bool(NVIDIA_API_KEY and NVIDIA_API_KEY.startswith("nvapi-")),
+        "llm_admission": admission.stats(),
     }
 
 if __name__ == "__main__":
@@ -0,0 +1,124 @@
+"""Memory and throughput of users_db entries: plain dicts vs config.records.
+
+    python -m benchmarks.records_bench --users 1000000
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timedelta
+
+from config.records import UserRecord
+
+TIERS = ["FREE", "FREE", "FREE", "BASIC", "PRO", "ENTERPRISE", "PREMIUM"]
+HASH = "$2b$12$" + "x" * 53
+
+
+def user_fields(i: int, start: datetime):
+    plugins = []
+    if i % 10 == 0:
+        plugins.append({"endpoint": "https://integrate.api.nvidia.com/v1", "key": f"nvapi-{i:040d}", "type": "text"})
+    return (
+        f"user{i}@example.com",
+        HASH[:-len(str(i))] + str(i),
+        TIERS[i % len(TIERS)],
+        i % 4,
+        (start + timedelta(seconds=i, microseconds=i % 997)).isoformat(),
+        plugins,
+    )
+
+
+def make_dict(i, start):
+    email, password, tier, used, created, plugins = user_fields(i, start)
+    return {
+        "email": email,
+        "password": password,
+        "is_admin": False,
+        "tier": tier,
+        "builds_used": used,
+        "created": created,
+        "plugins": plugins,
+    }
+
+
+def make_record(i, start):
+    email, password, tier, used, created, plugins = user_fields(i, start)
+    return UserRecord.from_dict({
+        "email": email, "password": password, "tier": tier,
+        "builds_used": used, "created": created, "plugins": plugins,
+    })
+
+
+def measure(factory, n):
+    start = datetime(2024, 1, 1)
+    gc.collect()
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    db = {str(uuid.UUID(int=i)): factory(i, start) for i in range(n)}
+    used = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    return db, used
+
+
+def throughput(label, db, get_email, serialize, n):
+    users = list(db.values())
+    target = get_email(users[-1])
+
+    t = time.perf_counter()
+    found = next(u for u in users if get_email(u) == target)
+    scan = time.perf_counter() - t
+
+    sample = users[: min(n, 200_000)]
+    t = time.perf_counter()
+    for u in sample:
+        serialize(u)
+    ser = time.perf_counter() - t
+
+    print(f"  {label:<8} full email scan: {scan * 1000:8.1f} ms   serialize: {len(sample) / ser:12,.0f} users/s")
+    return found
+
+
+def me_from_dict(user):
+    return {
+        "email": user["email"],
+        "tier": user.get("tier", "FREE"),
+        "is_admin": user.get("is_admin", False),
+        "builds_used": user.get("builds_used", 0),
+        "plugins": user.get("plugins", []),
+    }
+
+
+def me_from_record(user):
+    return {
+        "email": user.email,
+        "tier": user.tier.value,
+        "is_admin": user.is_admin,
+        "builds_used": user.builds_used,
+        "plugins": user.plugin_dicts(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=1_000_000)
+    n = parser.parse_args().users
+
+    start = datetime(2024, 1, 1)
+    for i in (0, 7, 10):
+        assert make_record(i, start).to_dict() == make_dict(i, start), "serializer output drifted"
+
+    print(f"{n:,} users")
+    dicts, dict_bytes = measure(make_dict, n)
+    print(f"  dict     {dict_bytes / n:8.1f} bytes/user   {dict_bytes / 2**20:8.1f} MiB")
+    throughput("dict", dicts, lambda u: u["email"], me_from_dict, n)
+    del dicts
+
+    records, record_bytes = measure(make_record, n)
+    print(f"  record   {record_bytes / n:8.1f} bytes/user   {record_bytes / 2**20:8.1f} MiB")
+    throughput("record", records, lambda u: u.email, me_from_record, n)
+    print(f"  saving   {100 * (1 - record_bytes / dict_bytes):.1f}% per worker")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""Match quality, memory and latency of agents.similarity.
+
+    python -m benchmarks.similarity_bench --entries 1000000
+
+The labelled pairs are what SIMILARITY_THRESHOLD and
+SIMILARITY_RETURN_THRESHOLD are set from: every paraphrase has to score at
+or above the threshold and every distinct request below it.
+"""
+import argparse
+import gc
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+from agents.similarity import SimilarityIndex, jaccard, token_hashes
+from config.settings import SIMILARITY_THRESHOLD, SIMILARITY_RETURN_THRESHOLD
+
+PARAPHRASES = [
+    ("todo app with dark mode", "dark themed todo list app"),
+    ("simple calculator", "basic calculator app"),
+    ("weather dashboard for my city", "city weather dashboard"),
+    ("portfolio website for a photographer", "photographer portfolio site"),
+    ("pomodoro timer with dark theme", "dark mode pomodoro timer app"),
+    ("landing page for a coffee shop", "coffee shop landing page"),
+    ("expense tracker with charts", "app to track expenses with charts"),
+    ("recipe sharing site", "site for sharing recipes"),
+    ("kanban board for tasks", "task kanban board"),
+    ("markdown note taking app", "notes app with markdown"),
+]
+
+DISTINCT = [
+    ("todo app with dark mode", "calculator app with dark mode"),
+    ("todo app with dark mode", "todo app with light mode"),
+    ("weather dashboard for my city", "sales dashboard"),
+    ("portfolio website for a photographer", "portfolio website for a developer"),
+    ("landing page for a coffee shop", "landing page for a dentist"),
+    ("expense tracker with charts", "habit tracker with charts"),
+    ("recipe sharing site", "photo sharing site"),
+    ("kanban board for tasks", "chess board game"),
+    ("markdown note taking app", "markdown blog"),
+    ("pomodoro timer with dark theme", "countdown timer for events"),
+]
+
+SUBJECTS = ["todo", "calculator", "weather", "portfolio", "pomodoro", "recipe", "kanban", "notes",
+            "expense", "habit", "chess", "blog", "crm", "inventory", "booking", "quiz", "chat", "music"]
+FEATURES = ["dark mode", "charts", "login", "search", "filters", "export", "offline support",
+            "drag and drop", "notifications", "calendar", "tags", "comments", "sharing", "maps"]
+THEMES = ["website-builder", "saas-boilerplate", "dashboard-suite", "landing-funnel"]
+PLATFORMS = ["web", "desktop", "android", "ios"]
+
+
+def quality():
+    para = [(jaccard(token_hashes(a), token_hashes(b)), a, b) for a, b in PARAPHRASES]
+    distinct = [(jaccard(token_hashes(a), token_hashes(b)), a, b) for a, b in DISTINCT]
+    print("paraphrases")
+    for score, a, b in sorted(para):
+        print(f"  {score:.2f}  {a!r} ~ {b!r}")
+    print("distinct requests")
+    for score, a, b in sorted(distinct, reverse=True):
+        print(f"  {score:.2f}  {a!r} / {b!r}")
+    low, high = min(s for s, _, _ in para), max(s for s, _, _ in distinct)
+    print(f"  lowest paraphrase {low:.2f}, highest distinct {high:.2f}; "
+          f"SIMILARITY_THRESHOLD={SIMILARITY_THRESHOLD} SIMILARITY_RETURN_THRESHOLD={SIMILARITY_RETURN_THRESHOLD}")
+    return low, high
+
+
+def synthetic_query(rng):
+    return f"{rng.choice(SUBJECTS)} app with {rng.choice(FEATURES)} and {rng.choice(FEATURES)} #{rng.randrange(10**6)}"
+
+
+def scale(n):
+    rng = random.Random(1)
+    path = os.path.join(tempfile.mkdtemp(), "index.jsonl")
+    writer = SimilarityIndex(path)
+    written = []
+    t = time.perf_counter()
+    for i in range(n):
+        build = (synthetic_query(rng), rng.choice(THEMES), rng.choice(PLATFORMS), f"user{i % 5000}@example.com")
+        writer.add(f"{i:08x}", build[0], build[1], build[2], "builds/x/index.html", build[3])
+        if i % max(n // 1000, 1) == 0:
+            written.append(build)
+    print(f"{n:,} entries written in {time.perf_counter() - t:.1f}s ({os.path.getsize(path) / 2**20:.0f} MiB on disk)")
+
+    index = SimilarityIndex(path)
+    t = time.perf_counter()
+    index.load()
+    print(f"  startup load  {time.perf_counter() - t:8.1f} s (in a background thread)")
+
+    del index
+    gc.collect()
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    index = SimilarityIndex(path)
+    index.load()
+    used = tracemalloc.get_traced_memory()[0] - base
+    peak = tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+    print(f"  memory        {used / n:8.1f} bytes/entry   {used / 2**20:8.1f} MiB per worker (peak {peak / 2**20:.0f} MiB)")
+
+    # Half the lookups repeat an indexed request, half are new ones.
+    for label, queries in (("hit", written), ("miss", [(synthetic_query(rng), *b[1:]) for b in written])):
+        latencies = []
+        for query, theme, platform, owner in queries:
+            t = time.perf_counter()
+            index.lookup(query, theme, platform, owner)
+            latencies.append(time.perf_counter() - t)
+        latencies.sort()
+        print(f"  lookup {label:<5}  p50 {latencies[len(latencies) // 2] * 1e6:6.0f} us   "
+              f"p99 {latencies[int(len(latencies) * 0.99)] * 1e6:6.0f} us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=1_000_000)
+    n = parser.parse_args().entries
+
+    low, high = quality()
+    assert high < SIMILARITY_THRESHOLD <= low, "threshold no longer separates the labelled pairs"
+    scale(n)
+
+
+if __name__ == "__main__":
+    main()
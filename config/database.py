@@ -1,5 +1,5 @@
-users_db = {}
-licenses_db = {}
+users_db = {}  # user_id -> config.records.UserRecord
+licenses_db = {}  # license_key -> config.records.LicenseRecord
 agents_db = {
     "architect": {"name": "Architect", "state": "IDLE", "tasks": 0},
     "planner": {"name": "Planner", "state": "IDLE", "tasks": 0},
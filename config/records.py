@@ -0,0 +1,130 @@
+import sys
+from datetime import datetime, timedelta
+from enum import Enum
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+class Tier(str, Enum):
+    FREE = "FREE"
+    BASIC = "BASIC"
+    PRO = "PRO"
+    ENTERPRISE = "ENTERPRISE"
+    PREMIUM = "PREMIUM"
+
+
+def _micros(dt: datetime) -> int:
+    return (dt - _EPOCH) // timedelta(microseconds=1)
+
+
+def _to_micros(ts: str) -> int:
+    return _micros(datetime.fromisoformat(ts))
+
+
+def _from_micros(micros: int) -> str:
+    return (_EPOCH + timedelta(microseconds=micros)).isoformat()
+
+
+def utcnow_micros() -> int:
+    return _micros(datetime.utcnow())
+
+
+class PluginRecord:
+    """A user's LLM plugin; provider and type strings are interned."""
+
+    __slots__ = ("provider", "endpoint", "key", "type")
+
+    def __init__(self, key: str, type: str, provider: str = None, endpoint: str = None):
+        self.provider = sys.intern(provider) if provider else None
+        self.endpoint = sys.intern(endpoint) if endpoint else None
+        self.key = key
+        self.type = sys.intern(type)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "PluginRecord":
+        return cls(data["key"], data["type"], data.get("provider"), data.get("endpoint"))
+
+    def to_dict(self) -> dict:
+        out = {}
+        if self.provider is not None:
+            out["provider"] = self.provider
+        if self.endpoint is not None:
+            out["endpoint"] = self.endpoint
+        out["key"] = self.key
+        out["type"] = self.type
+        return out
+
+
+class UserRecord:
+    """Compact replacement for the per-user dict in ``users_db``.
+
+    ``created`` is kept as integer microseconds and ``plugins`` as a tuple
+    (the shared empty tuple for most users); ``to_dict`` rebuilds the exact
+    dict the API has always returned.
+    """
+
+    __slots__ = ("email", "password", "is_admin", "tier", "builds_used", "created", "plugins")
+
+    def __init__(self, email: str, password: str, is_admin: bool = False, tier: Tier = Tier.FREE,
+                 builds_used: int = 0, created: int = None, plugins: tuple = ()):
+        self.email = email
+        self.password = password
+        self.is_admin = is_admin
+        self.tier = Tier(tier)
+        self.builds_used = builds_used
+        self.created = utcnow_micros() if created is None else created
+        self.plugins = plugins
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "UserRecord":
+        return cls(
+            data["email"],
+            data["password"],
+            data.get("is_admin", False),
+            data.get("tier", "FREE"),
+            data.get("builds_used", 0),
+            _to_micros(data["created"]) if data.get("created") else None,
+            tuple(PluginRecord.from_dict(p) for p in data.get("plugins", ())),
+        )
+
+    def add_plugin(self, plugin: PluginRecord):
+        self.plugins = self.plugins + (plugin,)
+
+    def replace_plugin(self, plugin: PluginRecord):
+        """Add ``plugin``, dropping any existing plugin of the same type."""
+        self.plugins = tuple(p for p in self.plugins if p.type != plugin.type) + (plugin,)
+
+    def remove_plugin(self, index: int):
+        self.plugins = self.plugins[:index] + self.plugins[index + 1:]
+
+    def plugin_dicts(self) -> list:
+        if not self.plugins:
+            return []
+        return [p.to_dict() for p in self.plugins]
+
+    def to_dict(self) -> dict:
+        return {
+            "email": self.email,
+            "password": self.password,
+            "is_admin": self.is_admin,
+            "tier": self.tier.value,
+            "builds_used": self.builds_used,
+            "created": _from_micros(self.created),
+            "plugins": self.plugin_dicts(),
+        }
+
+
+class LicenseRecord:
+    __slots__ = ("user_id", "tier", "status", "lifetime")
+
+    def __init__(self, user_id: str, tier: Tier, status: str = "active", lifetime: bool = None):
+        self.user_id = user_id
+        self.tier = Tier(tier)
+        self.status = sys.intern(status)
+        self.lifetime = lifetime
+
+    def to_dict(self) -> dict:
+        out = {"user_id": self.user_id, "tier": self.tier.value, "status": self.status}
+        if self.lifetime is not None:
+            out["lifetime"] = self.lifetime
+        return out
@@ -1,9 +1,43 @@
 import os
+import json
 from fastapi.security import HTTPBearer
 
 SECRET_KEY = os.getenv("SECRET_KEY", "yodda-premium-secret-key-change-in-production")
 NVIDIA_API_KEY = os.getenv("NVIDIA_API_KEY")
 NVIDIA_API_URL = "https://integrate.api.nvidia.com/v1"
 DEFAULT_MODEL = "meta/llama-3.1-8b-instruct"
+LARGE_MODEL = os.getenv("LARGE_MODEL", "meta/llama-3.1-70b-instruct")
+# fast/large model pair per model family (NVIDIA default, or the user's plugin type)
+MODEL_TIERS = {
+    "nvidia": {"fast": DEFAULT_MODEL, "large": LARGE_MODEL},
+    "text": {"fast": "gpt-3.5-turbo", "large": "gpt-4-turbo"},
+    "vision": {"fast": "gpt-4-vision-preview", "large": "gpt-4-vision-preview"},
+}
+# Per pricing tier: complexity score at which the large model is used up front
+# (None: never) and whether failed validation escalates to the large model.
+MODEL_TIER_POLICY = json.loads(os.getenv("MODEL_TIER_POLICY", "null")) or {
+    "FREE": {"large_above": None, "escalate": False},
+    "BASIC": {"large_above": 0.75, "escalate": True},
+    "PRO": {"large_above": 0.55, "escalate": True},
+    "ENTERPRISE": {"large_above": 0.45, "escalate": True},
+    "PREMIUM": {"large_above": 0.45, "escalate": True},
+}
+MULTI_PLATFORM_CONCURRENCY = int(os.getenv("MULTI_PLATFORM_CONCURRENCY", "4"))
+LLM_GLOBAL_CONCURRENCY = int(os.getenv("LLM_GLOBAL_CONCURRENCY", "16"))
+LLM_PROVIDER_CONCURRENCY = int(os.getenv("LLM_PROVIDER_CONCURRENCY", "8"))
+LLM_QUEUE_SIZE = int(os.getenv("LLM_QUEUE_SIZE", "32"))
+LLM_QUEUE_TIMEOUT = float(os.getenv("LLM_QUEUE_TIMEOUT", "30"))
+LLM_RETRY_AFTER = int(os.getenv("LLM_RETRY_AFTER", "10"))
+AUTH_LANE_THREADS = int(os.getenv("AUTH_LANE_THREADS", "8"))
+SIMILARITY_INDEX_PATH = os.getenv("SIMILARITY_INDEX_PATH", "similarity_index.jsonl")
+# Exact Jaccard over normalized query words; set from the labelled pairs in
+# benchmarks/similarity_bench.py. Serving a stored build verbatim needs more.
+SIMILARITY_THRESHOLD = float(os.getenv("SIMILARITY_THRESHOLD", "0.6"))
+SIMILARITY_RETURN_THRESHOLD = float(os.getenv("SIMILARITY_RETURN_THRESHOLD", "0.8"))
+# Match other users' builds too (their queries are never echoed back).
+SIMILARITY_CROSS_USER = os.getenv("SIMILARITY_CROSS_USER", "0") == "1"
+SIMILAR_BUILD_MODE = os.getenv("SIMILAR_BUILD_MODE", "off")
+SKELETON_DIR = os.getenv("SKELETON_DIR", "skeletons")
+TIMING_ENABLED = os.getenv("TIMING_ENABLED", "1") == "1"
 ADMIN_SETUP_DONE = False
 security = HTTPBearer()
@@ -20,6 +20,9 @@ source venv/bin/activate
 pip install -r requirements.txt
 pip install gunicorn
 
+# Pre-build the theme x platform skeleton library
+python -m agents.skeletons
+
 # Create systemd service file
 sudo tee /etc/systemd/system/yodda.service > /dev/null <<EOF
 [Unit]
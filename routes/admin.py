@@ -1,14 +1,25 @@
+import os
 import uuid
-from datetime import datetime
 from fastapi import APIRouter, HTTPException, Depends
-from agents.models import AdminSetup, AdminPluginRequest, ValidateRequest
+from fastapi.responses import PlainTextResponse
+from agents.models import AdminSetup, AdminPluginRequest, ValidateRequest, ProfileRequest
+from agents.events import bus
+from agents.profiler import profiler
+from agents.tiering import tiering_stats
 from config.database import users_db
+from config.records import UserRecord, PluginRecord, Tier
 from config.settings import ADMIN_SETUP_DONE
 from routes.auth import create_token, verify_token, hash_password
 from config.settings import NVIDIA_API_URL
 
 router = APIRouter()
 
+def arm_profiler(event: dict):
+    if event["worker"] != os.getpid():
+        profiler.arm(event["requests"], event["interval_ms"], event["session"])
+
+bus.on("profile_arm", arm_profiler)
+
 def validate_api(endpoint: str, key: str) -> bool:
     return bool(key and key.startswith("nvapi-"))
 
@@ -19,15 +30,7 @@ def setup_admin(data: AdminSetup):
         raise HTTPException(400, "Admin already exists")
     
     admin_id = str(uuid.uuid4())
-    users_db[admin_id] = {
-        "email": data.email,
-        "password": hash_password(data.password),
-        "is_admin": True,
-        "tier": "ENTERPRISE",
-        "builds_used": 0,
-        "created": datetime.utcnow().isoformat(),
-        "plugins": []
-    }
+    users_db[admin_id] = UserRecord(data.email, hash_password(data.password), is_admin=True, tier=Tier.ENTERPRISE)
     
     ADMIN_SETUP_DONE = True
     token = create_token(data.email, is_admin=True)
@@ -49,15 +52,13 @@ def admin_manage_plugins(req: AdminPluginRequest, payload=Depends(verify_token))
 
     target_user = None
     for u in users_db.values():
-        if u["email"] == target_email:
+        if u.email == target_email:
             target_user = u
             break
     if not target_user:
         raise HTTPException(404, f"User '{target_email}' not found")
 
-    plugin_entry = {"provider": req.provider, "key": req.key, "type": req.type}
-    target_user["plugins"] = [p for p in target_user.get("plugins", []) if p.get("type") != req.type]
-    target_user["plugins"].append(plugin_entry)
+    target_user.replace_plugin(PluginRecord(req.key, req.type, provider=req.provider))
     return {"message": f"API key for '{req.provider}' saved."}
 
 @router.post("/api/v1/admin/validate_key")
@@ -73,3 +74,33 @@ def admin_validate_key(req: ValidateRequest, payload=Depends(verify_token)):
             raise HTTPException(400, "API key is invalid.")
 
     return {"message": "API key is valid."}
+
+@router.post("/api/v1/admin/profile")
+def admin_start_profile(req: ProfileRequest, payload=Depends(verify_token)):
+    if not payload.get("is_admin"):
+        raise HTTPException(403, "Admin only")
+    if req.requests < 1 or req.interval_ms <= 0:
+        raise HTTPException(400, "requests and interval_ms must be positive")
+
+    session = profiler.arm(req.requests, req.interval_ms)
+    # Arm the other workers too; their samples are merged on export.
+    bus.publish({"type": "profile_arm", "session": session, "requests": req.requests, "interval_ms": req.interval_ms})
+    return {"message": f"Profiling the next {req.requests} requests on each worker.", **profiler.status()}
+
+@router.get("/api/v1/admin/profile")
+def admin_profile_status(payload=Depends(verify_token)):
+    if not payload.get("is_admin"):
+        raise HTTPException(403, "Admin only")
+    return profiler.status()
+
+@router.get("/api/v1/admin/profile/flamegraph", response_class=PlainTextResponse)
+def admin_profile_flamegraph(payload=Depends(verify_token)):
+    if not payload.get("is_admin"):
+        raise HTTPException(403, "Admin only")
+    return profiler.collapsed()
+
+@router.get("/api/v1/admin/model_tiers")
+def admin_model_tiers(payload=Depends(verify_token)):
+    if not payload.get("is_admin"):
+        raise HTTPException(403, "Admin only")
+    return tiering_stats.report()
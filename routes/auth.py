@@ -6,7 +6,10 @@ from fastapi import APIRouter, HTTPException, Depends
 from fastapi.security import HTTPAuthorizationCredentials
 from agents.models import UserRegister, UserLogin
 from config.database import users_db, licenses_db
+from config.records import UserRecord, LicenseRecord, Tier
 from config.settings import SECRET_KEY, security
+from agents.admission import run_in_auth_lane
+from agents.timing import span
 
 router = APIRouter()
 
@@ -24,8 +27,7 @@ def create_token(email: str, is_admin: bool = False) -> str:
     }
     return jwt.encode(payload, SECRET_KEY, algorithm="HS256")
 
-def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    token = credentials.credentials
+def decode_token(token: str):
     if not token:
         raise HTTPException(401, "No token provided")
     try:
@@ -34,29 +36,26 @@ def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
     except:
         raise HTTPException(401, "Invalid token")
 
+def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    with span("auth"):
+        return decode_token(credentials.credentials)
+
+# bcrypt is deliberately slow; register/login hash on their own thread lane so
+# they never wait behind LLM-bound requests.
 @router.post("/auth/register")
-def register(data: UserRegister):
+async def register(data: UserRegister):
+    return await run_in_auth_lane(register_user, data)
+
+def register_user(data: UserRegister):
     for user in users_db.values():
-        if user["email"] == data.email:
+        if user.email == data.email:
             raise HTTPException(400, "User already exists")
     
     user_id = str(uuid.uuid4())
-    users_db[user_id] = {
-        "email": data.email,
-        "password": hash_password(data.password),
-        "is_admin": False,
-        "tier": "FREE",
-        "builds_used": 0,
-        "created": datetime.utcnow().isoformat(),
-        "plugins": []
-    }
+    users_db[user_id] = UserRecord(data.email, hash_password(data.password))
     
     license_key = f"YP-FREE-{uuid.uuid4().hex[:8].upper()}"
-    licenses_db[license_key] = {
-        "user_id": user_id,
-        "tier": "FREE",
-        "status": "active"
-    }
+    licenses_db[license_key] = LicenseRecord(user_id, Tier.FREE)
     
     token = create_token(data.email)
     
@@ -68,32 +67,38 @@ def register(data: UserRegister):
     }
 
 @router.post("/auth/login")
-def login(data: UserLogin):
-    for user in users_db.values():
-        if user["email"] == data.email:
-            if verify_password(data.password, user["password"]):
-                token = create_token(data.email, user.get("is_admin", False))
-                return {
-                    "message": "Login successful",
-                    "token": token,
-                    "user": {
-                        "email": user["email"],
-                        "is_admin": user.get("is_admin", False),
-                        "tier": user.get("tier", "FREE")
-                    }
+async def login(data: UserLogin):
+    return await run_in_auth_lane(login_user, data)
+
+def login_user(data: UserLogin):
+    with span("user_lookup"):
+        user = next((u for u in users_db.values() if u.email == data.email), None)
+    if user:
+        with span("auth"):
+            valid = verify_password(data.password, user.password)
+        if valid:
+            token = create_token(data.email, user.is_admin)
+            return {
+                "message": "Login successful",
+                "token": token,
+                "user": {
+                    "email": user.email,
+                    "is_admin": user.is_admin,
+                    "tier": user.tier.value
                 }
-            raise HTTPException(401, "Invalid password")
+            }
+        raise HTTPException(401, "Invalid password")
     raise HTTPException(404, "User not found")
 
 @router.get("/auth/me")
 def get_current_user(payload = Depends(verify_token)):
     for user in users_db.values():
-        if user["email"] == payload["email"]:
+        if user.email == payload["email"]:
             return {
-                "email": user["email"],
-                "tier": user.get("tier", "FREE"),
-                "is_admin": user.get("is_admin", False),
-                "builds_used": user.get("builds_used", 0),
-                "plugins": user.get("plugins", [])
+                "email": user.email,
+                "tier": user.tier.value,
+                "is_admin": user.is_admin,
+                "builds_used": user.builds_used,
+                "plugins": user.plugin_dicts()
             }
     raise HTTPException(404, "User not found")
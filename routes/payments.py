@@ -2,12 +2,13 @@ import uuid
 from fastapi import APIRouter, HTTPException, Depends
 from agents.models import PaymentRequest, PaymentProcess
 from config.database import users_db, licenses_db, PRICING_TIERS
+from config.records import LicenseRecord, Tier
 from routes.auth import verify_token
 
 router = APIRouter()
 
 @router.get("/payments/tiers")
-def get_tiers():
+async def get_tiers():
     return {"tiers": PRICING_TIERS}
 
 @router.post("/payments/subscribe")
@@ -17,17 +18,12 @@ def subscribe(data: PaymentRequest, payload = Depends(verify_token)):
         raise HTTPException(400, "Invalid tier")
     
     for user in users_db.values():
-        if user["email"] == payload["email"]:
-            user["tier"] = tier
-            user["builds_used"] = 0
+        if user.email == payload["email"]:
+            user.tier = Tier(tier)
+            user.builds_used = 0
             
             license_key = f"YP-{tier}-{uuid.uuid4().hex[:8].upper()}"
-            licenses_db[license_key] = {
-                "user_id": payload["email"],
-                "tier": tier,
-                "status": "active",
-                "lifetime": data.lifetime
-            }
+            licenses_db[license_key] = LicenseRecord(payload["email"], tier, lifetime=data.lifetime)
             
             return {
                 "message": f"Subscribed to {tier}",
@@ -48,6 +44,6 @@ def process_payment(data: PaymentProcess, payload = Depends(verify_token)):
 def payment_history(payload = Depends(verify_token)):
     user_licenses = []
     for key, lic in licenses_db.items():
-        if lic["user_id"] == payload["email"]:
-            user_licenses.append({"license_key": key, **lic})
+        if lic.user_id == payload["email"]:
+            user_licenses.append({"license_key": key, **lic.to_dict()})
     return {"licenses": user_licenses}
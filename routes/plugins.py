@@ -1,6 +1,7 @@
 from fastapi import APIRouter, HTTPException, Depends
 from agents.models import Plugin, PluginManage
 from config.database import users_db
+from config.records import PluginRecord
 from routes.auth import verify_token
 from routes.admin import validate_api
 
@@ -9,10 +10,10 @@ router = APIRouter()
 @router.post("/plugins/add")
 def add_plugin(plugin: Plugin, payload = Depends(verify_token)):
     for user in users_db.values():
-        if user["email"] == payload["email"]:
+        if user.email == payload["email"]:
             if not validate_api(plugin.endpoint, plugin.key):
                 raise HTTPException(400, "Invalid API")
-            user["plugins"].append(plugin.dict())
+            user.add_plugin(PluginRecord.from_dict(plugin.dict()))
             return {"message": "Plugin added"}
     raise HTTPException(404, "User not found")
 
@@ -22,19 +23,19 @@ def manage_plugin(data: PluginManage, payload = Depends(verify_token)):
         raise HTTPException(403, "Admin only")
     if data.user_email:
         for user in users_db.values():
-            if user["email"] == data.user_email:
+            if user.email == data.user_email:
                 if not validate_api(data.plugin.endpoint, data.plugin.key):
                     raise HTTPException(400, "Invalid API")
-                user["plugins"].append(data.plugin.dict())
+                user.add_plugin(PluginRecord.from_dict(data.plugin.dict()))
                 return {"message": "Plugin added to user"}
     return {"message": "Global plugin managed"}
 
 @router.delete("/plugins/delete")
 def delete_plugin(index: int, payload = Depends(verify_token)):
     for user in users_db.values():
-        if user["email"] == payload["email"]:
-            if 0 <= index < len(user["plugins"]):
-                del user["plugins"][index]
+        if user.email == payload["email"]:
+            if 0 <= index < len(user.plugins):
+                user.remove_plugin(index)
                 return {"message": "Plugin deleted"}
             raise HTTPException(400, "Invalid index")
     raise HTTPException(404, "User not found")
@@ -1,17 +1,33 @@
 import os
+import json
+import asyncio
 import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextvars import copy_context
 from datetime import datetime
-from fastapi import APIRouter, HTTPException, Depends
-from agents.models import OrchestrateRequest
-from config.database import users_db, agents_db, PRICING_TIERS, THEME_PROMPTS
-from routes.auth import verify_token
+from time import perf_counter
+from urllib.parse import urlparse
+from fastapi import APIRouter, HTTPException, Depends, WebSocket, WebSocketDisconnect
+from agents.models import OrchestrateRequest, MultiOrchestrateRequest
+from agents.events import bus
+from config.records import UserRecord
+from config.database import users_db, agents_db, PRICING_TIERS, THEME_PROMPTS, PLATFORMS
+from routes.auth import verify_token, decode_token
 from agents.llm import call_llm
-from config.settings import NVIDIA_API_URL, NVIDIA_API_KEY, DEFAULT_MODEL
+from agents.admission import admission, run_llm_bound
+from agents.similarity import similarity_index
+from agents.timing import span, current_timing
+from agents.postprocess import extract_code, postprocess, is_html
+from agents.tiering import ModelRoute, route_model, score_complexity, tiering_stats
+from agents.skeletons import content_slots, has_skeleton, load_skeleton, merge, slot_prompt
+from config.settings import NVIDIA_API_URL, NVIDIA_API_KEY, MODEL_TIERS, MULTI_PLATFORM_CONCURRENCY, SIMILAR_BUILD_MODE, SIMILARITY_RETURN_THRESHOLD
 
 router = APIRouter()
 
-@router.get("/api/v1/swarm/agents")
-def list_agents():
+active_builds = set()
+REUSE_MODES = ("offer", "return", "refine")
+
+def agent_snapshot():
     agents = []
     for agent_id, data in agents_db.items():
         agents.append({
@@ -20,100 +36,466 @@ def list_agents():
             "state": data["state"],
             "completed_tasks": data["tasks"]
         })
-    return {"agents": agents}
+    return agents
 
-@router.post("/api/v1/swarm/orchestrate")
-def orchestrate(data: OrchestrateRequest, payload = Depends(verify_token)):
-    query = data.query
-    if not query:
-        raise HTTPException(400, "No query provided")
-    
-    user = None
-    for u in users_db.values():
-        if u["email"] == payload["email"]:
-            user = u
-            break
-    if not user:
-        raise HTTPException(404, "User not found")
-    
-    tier = user.get("tier", "FREE")
-    builds_used = user.get("builds_used", 0)
+def set_agent_state(agent_id: str, state: str):
+    if agent_id not in agents_db or agents_db[agent_id]["state"] == state:
+        return
+    agents_db[agent_id]["state"] = state
+    bus.publish({
+        "type": "agent_state",
+        "agent": agent_id,
+        "name": agents_db[agent_id]["name"],
+        "state": state,
+        "completed_tasks": agents_db[agent_id]["tasks"],
+    })
+
+def publish_queue():
+    bus.publish({"type": "queue", "active_builds": len(active_builds)})
+
+def worker_state() -> dict:
+    """This worker's agents and builds; dashboards sum these across workers."""
+    return {"type": "worker_state", "worker": os.getpid(), "agents": agent_snapshot(), "active_builds": len(active_builds)}
+
+# agents_db and active_builds are per worker: a new dashboard asks every worker
+# for its own state rather than trusting the one that accepted the socket.
+bus.on("snapshot_request", lambda event: bus.publish(worker_state()))
+
+@router.get("/api/v1/swarm/agents")
+def list_agents():
+    return {"agents": agent_snapshot()}
+
+@router.websocket("/api/v1/swarm/events")
+async def swarm_events(websocket: WebSocket, token: str = None):
+    try:
+        payload = decode_token(token)
+    except HTTPException:
+        await websocket.close(code=1008)
+        return
+
+    await websocket.accept()
+    sub = bus.subscribe(payload["email"], payload.get("is_admin", False))
+    # Read alongside the sender so a dashboard that goes away while nothing is
+    # being published is unsubscribed at once, not at the next failed send.
+    tasks = {asyncio.ensure_future(send_events(websocket, sub)), asyncio.ensure_future(wait_disconnect(websocket))}
+    try:
+        done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in pending:
+            task.cancel()
+        for task in done:
+            task.result()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        bus.unsubscribe(sub)
+
+async def send_events(websocket: WebSocket, sub):
+    await websocket.send_json(worker_state())
+    bus.publish({"type": "snapshot_request"})
+    while True:
+        event = await sub.queue.get()
+        if sub.lagged:
+            # Client could not keep up; drop it and let it reconnect for a fresh snapshot.
+            await websocket.close(code=1013, reason="Too slow, reconnect")
+            return
+        await websocket.send_json(event)
+
+async def wait_disconnect(websocket: WebSocket):
+    while (await websocket.receive())["type"] != "websocket.disconnect":
+        pass
+
+class BuildRun:
+    """Agent bookkeeping and live events for a single build id."""
+
+    def __init__(self, user: UserRecord, **info):
+        self.build_id = uuid.uuid4().hex[:8]
+        self.email = user.email
+        self.info = info
+        self.agents_used = []
+        self.agent_logs = []
+        self.current_agent = None
+
+    def log_agent(self, agent_id: str, action: str, **extra):
+        if self.current_agent and self.current_agent != agent_id:
+            set_agent_state(self.current_agent, "IDLE")
+        self.current_agent = agent_id
+        if agent_id in agents_db:
+            agents_db[agent_id]["tasks"] += 1
+            self.agents_used.append(agents_db[agent_id]["name"])
+            set_agent_state(agent_id, "WORKING")
+        self._log(agents_db.get(agent_id, {}).get("name", agent_id), action, **extra)
+
+    def _log(self, agent: str, action: str, **extra):
+        entry = {
+            "agent": agent,
+            "action": action,
+            "timestamp": datetime.utcnow().isoformat(),
+            **extra,
+        }
+        self.agent_logs.append(entry)
+        bus.publish({"type": "build_stage", "build_id": self.build_id, **entry}, user=self.email)
+
+    def log_timings(self):
+        timing = current_timing()
+        if timing is not None:
+            # A plain log line: no task count, agents_used entry or state change.
+            self._log(agents_db["orchestrator"]["name"], "Recorded stage timings.", timings_ms=timing.as_dict())
+
+    def __enter__(self):
+        active_builds.add(self.build_id)
+        publish_queue()
+        bus.publish({"type": "build_started", "build_id": self.build_id, **self.info}, user=self.email)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc is not None:
+            bus.publish({"type": "build_failed", "build_id": self.build_id, "error": str(exc)}, user=self.email)
+        if self.current_agent:
+            set_agent_state(self.current_agent, "IDLE")
+        active_builds.discard(self.build_id)
+        publish_queue()
+
+def find_user(email: str):
+    with span("user_lookup"):
+        for u in users_db.values():
+            if u.email == email:
+                return u
+    raise HTTPException(404, "User not found")
+
+def charge_builds(user: UserRecord, count: int = 1) -> int:
+    tier = user.tier.value
+    builds_used = user.builds_used
     max_builds = PRICING_TIERS[tier]["builds"]
-    
-    if max_builds != -1 and builds_used >= max_builds:
-        raise HTTPException(403, f"Build limit reached for {tier} tier")
-    
-    user["builds_used"] = builds_used + 1
-    
+
+    if max_builds != -1 and builds_used + count > max_builds:
+        if builds_used >= max_builds:
+            raise HTTPException(403, f"Build limit reached for {tier} tier")
+        raise HTTPException(403, f"{count} builds requested but only {max_builds - builds_used} left on {tier} tier")
+
+    user.builds_used = builds_used + count
+    return max_builds
+
+def builds_remaining(user: UserRecord, max_builds: int = None):
+    if max_builds is None:
+        max_builds = PRICING_TIERS[user.tier.value]["builds"]
+    return max_builds - user.builds_used if max_builds != -1 else "unlimited"
+
+def resolve_llm(user: UserRecord):
+    provider = "nvidia"
     endpoint = NVIDIA_API_URL
     key = NVIDIA_API_KEY
-    model = DEFAULT_MODEL
-    if user.get("plugins"):
-        plugin = user["plugins"][0]
-        endpoint = plugin["endpoint"]
-        key = plugin["key"]
-        model = "gpt-3.5-turbo" if plugin["type"] == "text" else "gpt-4-vision-preview"
-    
-    agents_used = []
-    agent_logs = []
-    generated_content = ""
-
-    theme_hint = THEME_PROMPTS.get(data.theme, "")
-
-    def log_agent(agent_id: str, action: str):
-        if agent_id in agents_db:
-            agents_db[agent_id]["tasks"] += 1
-            agents_used.append(agents_db[agent_id]["name"])
-        agent_logs.append(
-            {
-                "agent": agents_db.get(agent_id, {}).get("name", agent_id),
-                "action": action,
-                "timestamp": datetime.utcnow().isoformat(),
-            }
-        )
+    models = MODEL_TIERS["nvidia"]
+    if user.plugins:
+        plugin = user.plugins[0]
+        endpoint = plugin.endpoint or endpoint
+        key = plugin.key
+        models = MODEL_TIERS["text" if plugin.type == "text" else "vision"]
+        provider = plugin.provider or urlparse(endpoint).hostname or endpoint
+    return provider, endpoint, key, models
+
+def generate(provider: str, prompt: str, endpoint: str, key: str, model: str) -> str:
+    with span("llm_call"), admission.slot(provider):
+        return call_llm(prompt, endpoint, key, model)
+
+def generate_tiered(provider: str, prompt: str, endpoint: str, key: str, route: ModelRoute, skeleton: str = None):
+    """Generate on the routed model, retrying once if the output is unusable or incomplete.
+
+    An incomplete document is only retried when the route may escalate to the
+    large model.  A skeleton reply that cannot be merged is always retried, on
+    the large model when allowed, and raises 502 if the retry fails as well.
+
+    Returns ``(content, artifact, escalated)``.
+    """
+    start = perf_counter()
+    output = finish_output(generate(provider, prompt, endpoint, key, route.model), skeleton)
+    tiering_stats.record(route.tier, (perf_counter() - start) * 1000)
+    if output is not None and (output[1]["complete"] or not route.can_escalate):
+        return (*output, False)
 
-    log_agent("architect", "Parsed request and selected high-level architecture.")
-    log_agent("planner", f"Planned build flow for theme '{data.theme}'.")
-    log_agent("coder", "Generating application code via NVIDIA endpoint.")
-
-    prompt = (
-        f"You are a swarm of 8 expert agents (Architect, Planner, Coder, Reviewer, "
-        f"Tester, Ops, Security, Orchestrator) collaborating on a {data.platform} build.
-"
-        f"User request: {query}
-"
-        f"Selected theme: {data.theme}.
-"
-        f"Theme specification: {theme_hint}
-"
-        "Produce a complete, single-file implementation matching the theme and platform. "
-        "Return only the raw code (no markdown)."
+    model = route.large_model if route.can_escalate else route.model
+    start = perf_counter()
+    output = finish_output(generate(provider, prompt, endpoint, key, model), skeleton)
+    if route.can_escalate:
+        tiering_stats.record("large", (perf_counter() - start) * 1000, escalated=True)
+    else:
+        tiering_stats.record(route.tier, (perf_counter() - start) * 1000, retry=True)
+    if output is None:
+        raise HTTPException(502, "Model reply could not be merged into the page skeleton")
+    return (*output, route.can_escalate)
+
+def build_spec(query: str, theme: str) -> str:
+    """The platform-independent part of the prompt (architecture and plan)."""
+    return (
+        f"User request: {query}\n"
+        f"Selected theme: {theme}.\n"
+        f"Theme specification: {THEME_PROMPTS.get(theme, '')}\n"
     )
 
-    generated_content = call_llm(prompt, endpoint, key, model)
-    log_agent("reviewer", "Reviewed generated code for consistency.")
-    log_agent("tester", "Virtually tested main flows.")
-    log_agent("ops", "Prepared build artifact for deployment.")
-    log_agent("security", "Performed basic security sanity checks.")
-    
-    build_id = uuid.uuid4().hex[:8]
-    build_dir = f"builds/{build_id}"
-    os.makedirs(build_dir, exist_ok=True)
-    file_ext = data.platform if data.platform != "web" else "html"
-    file_path = f"{build_dir}/index.{file_ext}"
-    with open(file_path, "w") as f:
-        f.write(generated_content)
+def build_prompt(spec: str, platform: str, skeleton: str = None) -> str:
+    if skeleton:
+        task = slot_prompt(skeleton)
+    else:
+        task = ("Produce a complete, single-file implementation matching the theme and platform. "
+                "Return only the raw code (no markdown).")
+    with span("prompt_build"):
+        return (
+            f"You are a swarm of 8 expert agents (Architect, Planner, Coder, Reviewer, "
+            f"Tester, Ops, Security, Orchestrator) collaborating on a {platform} build.\n"
+            f"{spec}{task}"
+        )
+
+def pick_skeleton(theme: str, platform: str, enabled: bool = True):
+    if not enabled or not has_skeleton(theme, platform):
+        return None
+    return load_skeleton(theme, platform)
+
+def finish_output(raw: str, skeleton: str = None):
+    """Merge slot content into the skeleton (if any) and post-process the result.
+
+    Returns ``None`` when a skeleton build's reply is unusable: neither slot
+    JSON nor a full HTML document (typically JSON cut off at the token limit),
+    or JSON that fills none of the content slots.  It is never published as an
+    artifact.  Partly filled skeletons are reported incomplete.
+    """
+    with span("post_process"):
+        raw_bytes = len(raw.encode())
+        missing = []
+        if skeleton:
+            merged = merge(skeleton, raw)
+            if merged is None:
+                if not is_html(extract_code(raw)):
+                    return None
+            else:
+                raw, missing = merged
+                if missing == content_slots(skeleton):
+                    return None
+        content, artifact = postprocess(raw, raw_bytes)
+        if missing:
+            artifact["complete"] = False
+            artifact["issues"].append(f"empty slots: {', '.join(missing)}")
+        return content, artifact
 
+def write_artifact(build_dir: str, platform: str, content: str) -> str:
+    with span("artifact_write"):
+        os.makedirs(build_dir, exist_ok=True)
+        file_ext = platform if platform != "web" else "html"
+        file_name = f"index.{file_ext}"
+        with open(f"{build_dir}/{file_name}", "w") as f:
+            f.write(content)
+    return file_name
+
+def public_url(path: str) -> str:
     base_url = os.getenv("PUBLIC_BASE_URL", "https://159.65.144.25")
-    generated_url = f"{base_url}/builds/{build_id}/index.{file_ext}"
-    
+    return f"{base_url}/{path}"
+
+def find_similar_build(query: str, theme: str, platform: str, owner: str):
+    found = similarity_index.lookup(query, theme, platform, owner)
+    if not found or not os.path.exists(found[0]["path"]):
+        return None
+    entry, score = found
+    match = {
+        "build_id": entry["id"],
+        "similarity": round(score, 3),
+        "path": entry["path"],
+        "generated_url": public_url(entry["path"]),
+    }
+    # Another user's request text is theirs; only the build itself is shared.
+    if entry["owner"] == owner:
+        match["query"] = entry["query"]
+    return match
+
+@router.post("/api/v1/swarm/orchestrate")
+async def orchestrate(data: OrchestrateRequest, payload = Depends(verify_token)):
+    return await run_llm_bound(run_orchestrate, data, payload)
+
+def run_orchestrate(data: OrchestrateRequest, payload: dict):
+    query = data.query
+    if not query:
+        raise HTTPException(400, "No query provided")
+
+    user = find_user(payload["email"])
+
+    mode = (data.reuse or SIMILAR_BUILD_MODE).lower()
+    match = find_similar_build(query, data.theme, data.platform, user.email) if mode in REUSE_MODES else None
+    if match and mode == "return" and match["similarity"] < SIMILARITY_RETURN_THRESHOLD:
+        # Close enough to start from, not to serve as is.
+        mode = "refine"
+    if match and mode == "offer":
+        return {
+            "status": "similar_build_found",
+            "query": query,
+            "response": "A very similar build already exists. Resubmit with reuse='return', 'refine' or 'off'.",
+            "similar_build": match,
+            "builds_remaining": builds_remaining(user)
+        }
+    if match and mode == "return":
+        with open(match["path"]) as f:
+            generated_content = f.read()
+        return {
+            "status": "success",
+            "query": query,
+            "response": "Reused an existing build for a near-identical request.",
+            "generated_code": generated_content,
+            "generated_url": match["generated_url"],
+            "reused_from": match,
+            "agents_used": [],
+            "agent_logs": [],
+            "builds_remaining": builds_remaining(user)
+        }
+
+    max_builds = charge_builds(user)
+    provider, endpoint, key, models = resolve_llm(user)
+    route = route_model(models, score_complexity(query, data.theme, data.platform), user.tier.value)
+
+    try:
+        with BuildRun(user, platform=data.platform, theme=data.theme) as run:
+            run.log_agent("architect", "Parsed request and selected high-level architecture.")
+            run.log_agent("planner", f"Planned build flow for theme '{data.theme}'.")
+
+            skeleton = None if match else pick_skeleton(data.theme, data.platform, data.use_skeleton)
+            prompt = build_prompt(build_spec(query, data.theme), data.platform, skeleton)
+            if skeleton:
+                run.log_agent("planner", f"Loaded the {data.theme}/{data.platform} skeleton; only slot content is generated.")
+            if match:
+                with open(match["path"]) as f:
+                    prompt += (
+                        "\nStart from this existing implementation of a similar request "
+                        f"and adapt it to the new request instead of writing it from scratch:\n{f.read()}"
+                    )
+                run.log_agent("planner", f"Seeded from similar build {match['build_id']} (similarity {match['similarity']}).")
+            run.log_agent("orchestrator", f"Complexity score {route.score}: routed to the {route.tier} model {route.model}.")
+            run.log_agent("coder", "Generating application code via NVIDIA endpoint.")
+
+            generated_content, artifact, escalated = generate_tiered(provider, prompt, endpoint, key, route, skeleton)
+            if escalated:
+                run.log_agent("orchestrator", f"Output failed validation; escalated to {route.large_model}.")
+            run.log_agent("reviewer", "Reviewed generated code for consistency.")
+            if not artifact["complete"]:
+                run.log_agent("reviewer", f"Flagged incomplete output: {'; '.join(artifact['issues'])}.")
+            run.log_agent("tester", "Virtually tested main flows.")
+            run.log_agent("ops", "Prepared build artifact for deployment.")
+            run.log_agent("security", "Performed basic security sanity checks.")
+
+            file_name = write_artifact(f"builds/{run.build_id}", data.platform, generated_content)
+            similarity_index.add(run.build_id, query, data.theme, data.platform, f"builds/{run.build_id}/{file_name}", user.email)
+            run.log_timings()
+    except Exception:
+        # A build that fails is not charged.
+        user.builds_used -= 1
+        raise
+
+    generated_url = public_url(f"builds/{run.build_id}/{file_name}")
+    bus.publish({"type": "build_completed", "build_id": run.build_id, "generated_url": generated_url}, user=user.email)
+
     return {
         "status": "success",
         "query": query,
         "response": "Build complete! Your project is ready.",
         "generated_code": generated_content,
         "generated_url": generated_url,
-        "agents_used": agents_used,
-        "agent_logs": agent_logs,
-        "builds_remaining": max_builds - user["builds_used"] if max_builds != -1 else "unlimited"
+        "artifact": artifact,
+        "model": route.large_model if escalated else route.model,
+        "model_tier": "large" if escalated else route.tier,
+        "agents_used": run.agents_used,
+        "agent_logs": run.agent_logs,
+        "builds_remaining": builds_remaining(user, max_builds)
+    }
+
+@router.post("/api/v1/swarm/orchestrate/multi")
+async def orchestrate_multi(data: MultiOrchestrateRequest, payload = Depends(verify_token)):
+    return await run_llm_bound(run_orchestrate_multi, data, payload)
+
+def run_orchestrate_multi(data: MultiOrchestrateRequest, payload: dict):
+    query = data.query
+    if not query:
+        raise HTTPException(400, "No query provided")
+    platforms = list(dict.fromkeys(data.platforms))
+    unknown = [p for p in platforms if p not in PLATFORMS]
+    if not platforms or unknown:
+        raise HTTPException(400, f"Unsupported platforms: {', '.join(unknown) or 'none given'}")
+
+    user = find_user(payload["email"])
+    max_builds = charge_builds(user, len(platforms))
+    provider, endpoint, key, models = resolve_llm(user)
+    routes = {p: route_model(models, score_complexity(query, data.theme, p), user.tier.value) for p in platforms}
+
+    results = {}
+    try:
+        with BuildRun(user, platforms=platforms, theme=data.theme) as run:
+            # Architecture and planning are platform independent: derive them once.
+            run.log_agent("architect", "Parsed request and selected high-level architecture.")
+            spec = build_spec(query, data.theme)
+            run.log_agent("planner", f"Planned build flow for theme '{data.theme}' across {', '.join(platforms)}.")
+            run.log_agent("coder", f"Generating {len(platforms)} platform builds in parallel.")
+
+            skeletons = {p: pick_skeleton(data.theme, p, data.use_skeleton) for p in platforms}
+            build_dir = f"builds/{run.build_id}"
+            with ThreadPoolExecutor(max_workers=min(MULTI_PLATFORM_CONCURRENCY, len(platforms))) as pool:
+                futures = {
+                    pool.submit(
+                        copy_context().run, generate_tiered, provider,
+                        build_prompt(spec, platform, skeletons[platform]), endpoint, key, routes[platform], skeletons[platform],
+                    ): platform
+                    for platform in platforms
+                }
+                for future in as_completed(futures):
+                    platform = futures[future]
+                    try:
+                        content, artifact, escalated = future.result()
+                        file_name = write_artifact(f"{build_dir}/{platform}", platform, content)
+                        similarity_index.add(run.build_id, query, data.theme, platform, f"{build_dir}/{platform}/{file_name}", user.email)
+                    except Exception as e:
+                        error = getattr(e, "detail", str(e))
+                        results[platform] = {"status": "failed", "error": error}
+                        run.log_agent("coder", f"{platform} build failed: {error}")
+                        continue
+                    results[platform] = {
+                        "status": "success",
+                        "path": f"{platform}/{file_name}",
+                        "generated_url": public_url(f"{build_dir}/{platform}/{file_name}"),
+                        "artifact": artifact,
+                        "model": routes[platform].large_model if escalated else routes[platform].model,
+                        "model_tier": "large" if escalated else routes[platform].tier,
+                    }
+                    note = " after escalating to the large model" if escalated else ""
+                    run.log_agent("coder", f"{platform} build generated on the {routes[platform].tier} model{note}.")
+
+            succeeded = [p for p in platforms if results[p]["status"] == "success"]
+            failed = [p for p in platforms if results[p]["status"] == "failed"]
+            if not succeeded:
+                raise HTTPException(502, f"All platform builds failed: {results[platforms[0]]['error']}")
+
+            run.log_agent("reviewer", "Reviewed generated code for consistency across platforms.")
+            run.log_agent("tester", "Virtually tested main flows.")
+            run.log_agent("ops", "Prepared build artifacts and manifest for deployment.")
+            run.log_agent("security", "Performed basic security sanity checks.")
+
+            manifest = {
+                "build_id": run.build_id,
+                "query": query,
+                "theme": data.theme,
+                "created": datetime.utcnow().isoformat(),
+                "platforms": {p: {k: v for k, v in results[p].items() if k != "generated_url"} for p in platforms},
+            }
+            with span("artifact_write"), open(f"{build_dir}/manifest.json", "w") as f:
+                json.dump(manifest, f, indent=2)
+            run.log_timings()
+    finally:
+        # Only platforms that produced an artifact count against the quota,
+        # however the request ends.
+        user.builds_used -= sum(1 for p in platforms if results.get(p, {}).get("status") != "success")
+
+    manifest_url = public_url(f"{build_dir}/manifest.json")
+    bus.publish({"type": "build_completed", "build_id": run.build_id, "generated_url": manifest_url}, user=user.email)
+
+    return {
+        "status": "success" if not failed else "partial",
+        "query": query,
+        "build_id": run.build_id,
+        "response": f"Built {len(succeeded)} of {len(platforms)} platforms.",
+        "manifest_url": manifest_url,
+        "platforms": results,
+        "agents_used": run.agents_used,
+        "agent_logs": run.agent_logs,
+        "builds_remaining": builds_remaining(user, max_builds)
     }
@@ -0,0 +1,59 @@
+from agents.postprocess import dedupe_assets, extract_code, minify_css, minify_html, minify_js, postprocess
+
+
+def test_minify_js_keeps_multiline_template_literals():
+    template = "`\n    <pre>line1\n        indented</pre>\n\n    end`"
+    js = f"  const page = {template};\n\n  // render\n  document.body.innerHTML = page;\n"
+    assert minify_js(js) == f"const page = {template};\ndocument.body.innerHTML = page;"
+
+
+def test_minify_js_keeps_nested_templates_and_strings():
+    js = "el.innerHTML = `\n  <ul>\n    ${items.map(i => `\n      <li>${i}</li>`).join('\n')}\n  </ul>`;"
+    assert minify_js(js) == js
+
+
+def test_minify_js_strips_comments_and_indentation():
+    js = "function f() {\n    /* block */ return 1; // trailing\n\n}\n"
+    assert minify_js(js) == "function f() {\nreturn 1;\n}"
+
+
+def test_minify_html_leaves_script_templates_alone():
+    page = "<html><body><script>\n  const t = `\n    a\n\n      b`;\n</script></body></html>"
+    assert "`\n    a\n\n      b`" in minify_html(page)
+
+
+def test_extract_code_accepts_closing_fence_at_end_of_line():
+    reply = "Here you go:\n```html\n<!DOCTYPE html>\n<html><body></body></html>```\nEnjoy!"
+    assert extract_code(reply) == "<!DOCTYPE html>\n<html><body></body></html>"
+
+
+def test_extract_code_picks_longest_block():
+    reply = "```html\n<html><body>app</body></html>\n```\nRun it with:\n```\nopen index.html\n```"
+    assert extract_code(reply) == "<html><body>app</body></html>"
+
+
+def test_postprocess_flags_truncated_document():
+    code, report = postprocess("```html\n<!DOCTYPE html><html><body><p>cut")
+    assert code.startswith("<!DOCTYPE html>")
+    assert not report["complete"]
+
+
+def test_minify_css_ignores_quotes_inside_comments():
+    css = "/* Don't touch */ .a::after { content: 'a  >  b'; }"
+    assert minify_css(css) == ".a::after{content:'a  >  b'}"
+
+
+def test_dedupe_assets_leaves_script_strings_alone():
+    page = ('<html><head><link rel="x" href="y"><link rel="x" href="y"></head><body>'
+            "<script>const a = '<link rel=\"x\" href=\"y\">';</script>"
+            "<script>const b = '<link rel=\"x\" href=\"y\">';</script>"
+            '<script src="app.js"></script><script src="app.js"></script></body></html>')
+    out = dedupe_assets(page)
+    assert out.count('<link rel="x" href="y">') == 3
+    assert "const b = '<link" in out
+    assert out.count('src="app.js"') == 1
+
+
+def test_postprocess_reports_the_reply_size_when_given():
+    _, report = postprocess("<html><body></body></html>", raw_bytes=120)
+    assert report["raw_bytes"] == 120
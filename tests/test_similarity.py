@@ -0,0 +1,40 @@
+from agents.similarity import SimilarityIndex, MERGE_EVERY
+
+
+def make_index(tmp_path, **kwargs):
+    index = SimilarityIndex(str(tmp_path / "index.jsonl"), **kwargs)
+    index.load()
+    return index
+
+
+def test_request_paraphrase_matches_and_other_apps_do_not(tmp_path):
+    index = make_index(tmp_path)
+    index.add("b1", "todo app with dark mode", "website-builder", "web", "builds/b1/index.html", "a@x.io")
+
+    found = index.lookup("dark themed todo list app", "website-builder", "web", "a@x.io")
+    assert found is not None
+    entry, score = found
+    assert entry["id"] == "b1" and score == 1.0
+
+    assert index.lookup("calculator app with dark mode", "website-builder", "web", "a@x.io") is None
+    assert index.lookup("dark themed todo list app", "website-builder", "ios", "a@x.io") is None
+
+
+def test_lookup_only_matches_the_callers_builds(tmp_path):
+    index = make_index(tmp_path)
+    index.add("b1", "todo app with dark mode", "website-builder", "web", "builds/b1/index.html", "a@x.io")
+    assert index.lookup("todo app with dark mode", "website-builder", "web", "b@x.io") is None
+
+    shared = make_index(tmp_path, cross_user=True)
+    entry, _ = shared.lookup("todo app with dark mode", "website-builder", "web", "b@x.io")
+    assert entry["owner"] == "a@x.io"
+
+
+def test_other_workers_entries_survive_a_merge(tmp_path):
+    writer = make_index(tmp_path)
+    reader = make_index(tmp_path)
+    for i in range(MERGE_EVERY + 5):
+        writer.add(f"b{i}", f"inventory tracker number {i}", "dashboard-suite", "web", f"builds/b{i}/index.html", "a@x.io")
+    entry, _ = reader.lookup("inventory tracker number 7", "dashboard-suite", "web", "a@x.io")
+    assert entry["id"] == "b7"
+    assert len(reader) == MERGE_EVERY + 5
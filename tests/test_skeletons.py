@@ -0,0 +1,37 @@
+import json
+
+from agents.skeletons import _render, content_slots, merge
+from routes.swarm import finish_output
+
+SKELETON = _render("website-builder", "web")
+
+
+def test_merge_reports_every_content_slot_missing_for_empty_reply():
+    page, missing = merge(SKELETON, "{}")
+    assert missing == content_slots(SKELETON)
+    assert "{{slot:" not in page
+    assert finish_output("{}", SKELETON) is None
+
+
+def test_merge_reports_missing_and_empty_slots():
+    reply = json.dumps({"title": "Todo", "hero": "<h1>Todo</h1>", "features": "  ", "styles": ""})
+    _, missing = merge(SKELETON, reply)
+    assert "hero" not in missing and "title" not in missing
+    assert {"features", "pricing", "contact", "nav"} <= set(missing)
+    assert "styles" not in missing and "script" not in missing
+
+    content, artifact = finish_output(reply, SKELETON)
+    assert "<h1>Todo</h1>" in content
+    assert not artifact["complete"]
+    assert any("features" in issue for issue in artifact["issues"])
+
+
+def test_truncated_slot_json_is_unusable():
+    assert merge(SKELETON, '{"title": "Todo", "hero": "<h1>cut') is None
+    assert finish_output('{"title": "Todo", "hero": "<h1>cut', SKELETON) is None
+
+
+def test_fully_filled_reply_is_complete():
+    reply = json.dumps({name: f"<p>{name}</p>" for name in content_slots(SKELETON)})
+    _, artifact = finish_output(reply, SKELETON)
+    assert artifact["complete"], artifact["issues"]